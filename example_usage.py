@@ -109,9 +109,7 @@ def example_4_analysis_and_insights():
     db = AdDatabase()
 
     # Buscar ads do database
-    from src.storage.database import Ad
-    all_ads = db.session.query(Ad).all()
-    df = db._to_dataframe(all_ads)
+    df = db.get_all()
 
     if len(df) == 0:
         print("\nNenhum dado disponível. Execute primeiro os exemplos 1 ou 2.")
@@ -65,6 +65,7 @@ class AlertSystem:
 def monitor_with_alerts():
     """Monitoramento com sistema de alertas"""
     from src.main import AdIntelligencePipeline
+    from src.processors.ad_parser import utc_now
 
     pipeline = AdIntelligencePipeline()
     alerts = AlertSystem(slack_webhook_url='YOUR_WEBHOOK_URL')
@@ -75,13 +76,16 @@ def monitor_with_alerts():
     # Detectar novos ads
     new_ads = []
     for page in competitors:
-        ads = pipeline.api.search_ads(page, limit=50)
+        # Só id, página, início e headline: bem menos JSON por página
+        ads = pipeline.api.search_ads(page, limit=50, field_profile='monitor')
 
         for ad in ads:
             # Verificar se é novo (menos de 7 dias)
-            from datetime import datetime, timedelta
+            from datetime import datetime, timezone
             start = datetime.fromisoformat(ad['ad_delivery_start_time'].replace('Z', '+00:00'))
-            if (datetime.now() - start).days <= 7:
+            if start.tzinfo is not None:
+                start = start.astimezone(timezone.utc).replace(tzinfo=None)
+            if (utc_now() - start).days <= 7:
                 new_ads.append({
                     'page': ad['page_name'],
                     'headline': ad.get('ad_creative_link_titles', [''])[0],
@@ -92,17 +96,23 @@ def monitor_with_alerts():
     if new_ads:
         alerts.alert_new_competitor_ads(new_ads)
 
-    # Buscar high performers
+    # Buscar high performers: só o primeiro chunk (3 ads) é lido
     from src.storage.database import Ad
-    high_performers = pipeline.db.session.query(Ad).filter(
-        Ad.days_active >= 60,
-        Ad.is_active == True
-    ).all()
-
-    for ad in high_performers[:3]:  # Top 3
+    high_performers = pipeline.db.iter_chunks(
+        filter=(Ad.days_active >= 60) & (Ad.is_active == True),
+        columns=['page_name', 'days_active', 'headline', 'cta_detected'],
+        chunk_size=3
+    )
+    top = next(high_performers, None)
+    high_performers.close()
+
+    if top is None:
+        return
+
+    for _, ad in top.iterrows():
         alerts.alert_high_performing_ad({
-            'page_name': ad.page_name,
-            'days_active': ad.days_active,
-            'headline': ad.headline,
-            'cta_detected': ad.cta_detected
+            'page_name': ad['page_name'],
+            'days_active': ad['days_active'],
+            'headline': ad['headline'],
+            'cta_detected': ad['cta_detected']
         })
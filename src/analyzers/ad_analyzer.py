@@ -1,8 +1,14 @@
 # analyzers/ad_analyzer.py
 import pandas as pd
+import pyarrow as pa
 from collections import Counter
-from typing import Dict, List
+from typing import Dict, Iterable, List
 import re
+from src.processors.arrow_output import table_to_pandas
+from src.storage.parquet_archive import ParquetArchive
+
+# Colunas numéricas que podem chegar nulas (registros parciais)
+NUMERIC_COLUMNS = ['days_active', 'text_length']
 
 
 class AdAnalyzer:
@@ -11,8 +17,24 @@ class AdAnalyzer:
     """
 
     def __init__(self, ads_df: pd.DataFrame):
+        # Tabela Arrow (AdParser.parse_table) também é aceita
+        if isinstance(ads_df, pa.Table):
+            ads_df = table_to_pandas(ads_df)
         self.df = ads_df
 
+    @classmethod
+    def from_parquet(cls, root: str = None, **filters) -> 'AdAnalyzer':
+        """
+        Analyzer sobre o arquivo Parquet (ver ParquetArchive.read_table)
+
+        Ex.: AdAnalyzer.from_parquet(keywords=['video ai'], since=datetime(2024, 5, 1))
+        """
+        return cls(ParquetArchive(root).read_table(**filters))
+
+    @property
+    def total_ads(self) -> int:
+        return len(self.df)
+
     def get_top_performers(self, min_days: int = 30, top_n: int = 10) -> pd.DataFrame:
         """
         Ads com maior longevidade (provável bom performance)
@@ -42,19 +64,7 @@ class AdAnalyzer:
         """
         Palavras mais frequentes nos ads
         """
-        # Combinar todo o texto
-        all_text = ' '.join(self.df['full_text'].dropna().astype(str))
-
-        # Tokenizar
-        words = re.findall(r'\b\w+\b', all_text.lower())
-
-        # Filtrar stopwords comuns e palavras curtas
-        stopwords = {'the', 'and', 'for', 'you', 'your', 'with', 'this',
-                     'that', 'from', 'are', 'our', 'can', 'get', 'now'}
-        words = [w for w in words if len(w) >= min_length and w not in stopwords]
-
-        # Contar
-        return Counter(words).most_common(top_n)
+        return _count_words(self.df, min_length).most_common(top_n)
 
     def analyze_by_page(self) -> pd.DataFrame:
         """
@@ -122,14 +132,14 @@ class AdAnalyzer:
         insights = []
 
         # Total ads
-        insights.append(f"Total de {len(self.df)} ads coletados")
+        insights.append(f"Total de {self.total_ads} ads coletados")
 
         # Top performers
         top = self.get_top_performers(min_days=30, top_n=3)
         if len(top) > 0:
             insights.append(f"\nTop 3 ads mais longevos:")
             for _, ad in top.iterrows():
-                headline = ad['headline'][:50] if ad['headline'] else 'Sem headline'
+                headline = ad['headline'][:50] if pd.notna(ad['headline']) and ad['headline'] else 'Sem headline'
                 insights.append(f"  • {ad['page_name']}: {ad['days_active']} dias - '{headline}...'")
 
         # CTAs
@@ -137,7 +147,7 @@ class AdAnalyzer:
         if len(ctas) > 0:
             insights.append(f"\nCTAs mais usados:")
             for cta, count in ctas.head(3).items():
-                insights.append(f"  • {cta}: {count} ads ({count/len(self.df)*100:.1f}%)")
+                insights.append(f"  • {cta}: {count} ads ({count/self.total_ads*100:.1f}%)")
 
         # Padrões de texto
         patterns = self.analyze_text_patterns()
@@ -152,3 +162,234 @@ class AdAnalyzer:
         insights.append(f"  {', '.join([w[0] for w in words[:10]])}")
 
         return '\n'.join(insights)
+
+
+class ChunkedAdAnalyzer(AdAnalyzer):
+    """
+    AdAnalyzer sobre um corpus lido em chunks (AdDatabase.iter_chunks)
+
+    Cada chunk é dobrado em contadores e somas e descartado: a memória
+    depende do número de páginas, CTAs e palavras distintas, não do número
+    de ads. Os resultados são os mesmos do AdAnalyzer com o DataFrame
+    inteiro; min_days e top_n ficam fixos na construção.
+    """
+
+    # Colunas lidas do database (projeção para iter_chunks)
+    COLUMNS = [
+        'ad_id', 'page_name', 'days_active', 'is_active', 'body', 'headline',
+        'full_text', 'text_length', 'has_emoji', 'has_hashtags', 'cta_detected'
+    ]
+
+    def __init__(self, chunks: Iterable[pd.DataFrame], min_days: int = 30, top_n: int = 10, min_word_length: int = 4):
+        self.df = None
+        self.min_days = min_days
+        self.top_n = top_n
+        self.min_word_length = min_word_length
+
+        self._total = 0
+        self._ctas = None
+        self._text_lengths = None  # comprimento -> nº de ads (mediana exata)
+        self._emoji = 0
+        self._hashtags = 0
+        self._words = Counter()
+        self._top = None
+        self._pages = None
+        self._page_ctas = None
+        self._successful = {'count': 0, 'text_length_sum': 0, 'text_length_count': 0, 'emoji': 0, 'hashtags': 0}
+        self._successful_ctas = None
+        self._sample_headlines: List[str] = []
+
+        for chunk in chunks:
+            self.update(chunk)
+
+    @classmethod
+    def from_parquet(cls, root: str = None, min_days: int = 30, top_n: int = 10, **filters) -> 'ChunkedAdAnalyzer':
+        """Analyzer sobre o arquivo Parquet, lido em lotes (ver ParquetArchive.iter_batches)"""
+        batches = ParquetArchive(root).iter_batches(columns=cls.COLUMNS, **filters)
+        return cls(batches, min_days=min_days, top_n=top_n)
+
+    @property
+    def total_ads(self) -> int:
+        return self._total
+
+    def update(self, chunk: pd.DataFrame):
+        """Dobrar mais um chunk nos agregados"""
+        if isinstance(chunk, pa.Table):
+            chunk = table_to_pandas(chunk)
+        if len(chunk) == 0:
+            return
+
+        # Chunk só com registros parciais tem days_active/text_length todo
+        # nulo (dtype object): nlargest e as somas precisam de números
+        chunk = chunk.assign(**{
+            column: pd.to_numeric(chunk[column], errors='coerce') for column in NUMERIC_COLUMNS
+        })
+
+        self._total += len(chunk)
+        self._ctas = _add(self._ctas, chunk['cta_detected'].value_counts())
+        self._text_lengths = _add(self._text_lengths, chunk['text_length'].value_counts())
+        self._emoji += chunk['has_emoji'].sum()
+        self._hashtags += chunk['has_hashtags'].sum()
+        self._words.update(_count_words(chunk, self.min_word_length))
+
+        top = chunk[chunk['days_active'] >= self.min_days].nlargest(self.top_n, 'days_active')
+        if self._top is not None:
+            top = pd.concat([self._top, top]).nlargest(self.top_n, 'days_active')
+        self._top = top[['page_name', 'days_active', 'body', 'headline', 'cta_detected']]
+
+        pages = chunk.groupby('page_name').agg(
+            total_ads=('ad_id', 'count'),
+            days_active_sum=('days_active', 'sum'),
+            days_active_count=('days_active', 'count'),
+            active_ads=('is_active', 'sum'),
+            text_length_sum=('text_length', 'sum'),
+            text_length_count=('text_length', 'count'),
+            ads_with_emoji=('has_emoji', 'sum'),
+        )
+        self._pages = _add(self._pages, pages)
+        self._page_ctas = _add(self._page_ctas, chunk.groupby(['page_name', 'cta_detected']).size())
+
+        successful = chunk[chunk['days_active'] >= self.min_days]
+        if len(successful):
+            self._successful['count'] += len(successful)
+            self._successful['text_length_sum'] += successful['text_length'].sum()
+            self._successful['text_length_count'] += successful['text_length'].count()
+            self._successful['emoji'] += successful['has_emoji'].sum()
+            self._successful['hashtags'] += successful['has_hashtags'].sum()
+            self._successful_ctas = _add(self._successful_ctas, successful['cta_detected'].value_counts())
+            if len(self._sample_headlines) < 5:
+                headlines = successful['headline'].dropna().head(5 - len(self._sample_headlines))
+                self._sample_headlines.extend(headlines.tolist())
+
+    def get_top_performers(self, min_days: int = 30, top_n: int = 10) -> pd.DataFrame:
+        self._check_fold(min_days, top_n)
+        if self._top is None:
+            return pd.DataFrame(columns=['page_name', 'days_active', 'body', 'headline', 'cta_detected'])
+        return self._top.head(top_n)
+
+    def analyze_cta_distribution(self) -> pd.Series:
+        return _counts(self._ctas, 'cta_detected')
+
+    def analyze_text_patterns(self) -> Dict:
+        lengths = self._text_lengths.sort_index() if self._text_lengths is not None else pd.Series(dtype='int64')
+        count = lengths.sum()
+        return {
+            'avg_text_length': (lengths.index * lengths).sum() / count if count else float('nan'),
+            'median_text_length': _median_from_counts(lengths),
+            'emoji_usage': (self._emoji / self._total) * 100,
+            'hashtag_usage': (self._hashtags / self._total) * 100,
+        }
+
+    def get_most_common_words(self, top_n: int = 50, min_length: int = 4) -> List[tuple]:
+        if min_length != self.min_word_length:
+            raise ValueError(f"Palavras contadas com min_length={self.min_word_length}")
+        return self._words.most_common(top_n)
+
+    def analyze_by_page(self) -> pd.DataFrame:
+        if self._pages is None:
+            return pd.DataFrame(columns=['total_ads', 'avg_days_active', 'active_ads', 'avg_text_length', 'ads_with_emoji'])
+
+        pages = self._pages
+        by_page = pd.DataFrame({
+            'total_ads': pages['total_ads'].astype('int64'),
+            'avg_days_active': pages['days_active_sum'] / pages['days_active_count'],
+            'active_ads': pages['active_ads'].astype('int64'),
+            'avg_text_length': pages['text_length_sum'] / pages['text_length_count'],
+            'ads_with_emoji': pages['ads_with_emoji'].astype('int64'),
+        })
+        return by_page.sort_values('total_ads', ascending=False)
+
+    def get_successful_patterns(self, min_days: int = 30) -> Dict:
+        self._check_fold(min_days)
+        successful = self._successful
+        if successful['count'] == 0:
+            return {}
+
+        return {
+            'common_ctas': _counts(self._successful_ctas, 'cta_detected').head(5).to_dict(),
+            'avg_text_length': (
+                successful['text_length_sum'] / successful['text_length_count']
+                if successful['text_length_count'] else float('nan')
+            ),
+            'emoji_usage_rate': (successful['emoji'] / successful['count']) * 100,
+            'hashtag_usage_rate': (successful['hashtags'] / successful['count']) * 100,
+            'sample_headlines': list(self._sample_headlines)
+        }
+
+    def compare_competitors(self, pages: List[str]) -> pd.DataFrame:
+        by_page = self.analyze_by_page()
+        comparison = []
+
+        for page in pages:
+            if page not in by_page.index:
+                continue
+
+            row = by_page.loc[page]
+            page_ctas = self._page_ctas[self._page_ctas.index.get_level_values(0) == page]
+            page_ctas = page_ctas[page_ctas > 0]
+            # Empate: o menor valor, como Series.mode()
+            most_common = None
+            if len(page_ctas):
+                tied = page_ctas[page_ctas == page_ctas.max()]
+                most_common = sorted(tied.index.get_level_values(1))[0]
+
+            comparison.append({
+                'page': page,
+                'total_ads': int(row['total_ads']),
+                'active_ads': int(row['active_ads']),
+                'avg_days_active': row['avg_days_active'],
+                'most_common_cta': most_common,
+                'emoji_usage_%': (row['ads_with_emoji'] / row['total_ads']) * 100,
+                'avg_text_length': row['avg_text_length']
+            })
+
+        return pd.DataFrame(comparison).sort_values('total_ads', ascending=False)
+
+    def _check_fold(self, min_days: int, top_n: int = None):
+        if min_days != self.min_days or (top_n is not None and top_n > self.top_n):
+            raise ValueError(
+                f"Agregados calculados com min_days={self.min_days}, top_n={self.top_n}"
+            )
+
+
+def _count_words(df: pd.DataFrame, min_length: int) -> Counter:
+    """Palavras do full_text (sem stopwords comuns e palavras curtas)"""
+    # Combinar todo o texto
+    all_text = ' '.join(df['full_text'].dropna().astype(str))
+
+    # Tokenizar
+    words = re.findall(r'\b\w+\b', all_text.lower())
+
+    # Filtrar stopwords comuns e palavras curtas
+    stopwords = {'the', 'and', 'for', 'you', 'your', 'with', 'this',
+                 'that', 'from', 'are', 'our', 'can', 'get', 'now'}
+    return Counter(w for w in words if len(w) >= min_length and w not in stopwords)
+
+
+def _add(total, counts):
+    """Somar contagens/somas de um chunk ao acumulado (None = vazio)"""
+    if total is None:
+        return counts
+    return total.add(counts, fill_value=0)
+
+
+def _counts(counts: pd.Series, name: str) -> pd.Series:
+    """Contagens somadas entre chunks, no formato de value_counts()"""
+    if counts is None:
+        return pd.Series(dtype='int64', name='count', index=pd.Index([], name=name))
+    counts = counts.astype('int64').sort_values(ascending=False, kind='stable')
+    counts.index.name = name
+    counts.name = 'count'
+    return counts
+
+
+def _median_from_counts(counts: pd.Series) -> float:
+    """Mediana a partir de valor -> frequência (índice ordenado)"""
+    total = counts.sum()
+    if not total:
+        return float('nan')
+
+    cumulative = counts.cumsum()
+    lower = counts.index[cumulative.searchsorted((total + 1) // 2)]
+    upper = counts.index[cumulative.searchsorted(total // 2 + 1)]
+    return (lower + upper) / 2
@@ -3,6 +3,9 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+from typing import Iterable
+from src.processors.arrow_output import table_to_pandas
 
 
 class AdvancedAnalyzer:
@@ -10,10 +13,24 @@ class AdvancedAnalyzer:
     Análises avançadas com ML
     """
 
+    # Colunas usadas por cada análise (projeção ao ler do database)
+    CLUSTER_COLUMNS = ['page_name', 'days_active', 'full_text', 'cta_detected']
+    TREND_COLUMNS = ['ad_id', 'start_date', 'text_length', 'has_emoji', 'cta_detected']
+
+    def __init__(self, engine=None):
+        """
+        Args:
+            engine: DuckDBEngine opcional; com ele as tendências rodam em
+                SQL sobre o database/arquivo, sem carregar os ads
+        """
+        self.engine = engine
+
     def cluster_ad_strategies(self, ads_df: pd.DataFrame, n_clusters: int = 5):
         """
         Agrupar ads por similaridade de estratégia usando clustering
         """
+        if isinstance(ads_df, pa.Table):
+            ads_df = table_to_pandas(ads_df)
 
         # Combinar texto
         texts = ads_df['full_text'].fillna('')
@@ -49,10 +66,19 @@ class AdvancedAnalyzer:
 
         return pd.DataFrame(cluster_analysis)
 
-    def analyze_trends_over_time(self, ads_df: pd.DataFrame):
+    def analyze_trends_over_time(self, ads_df: pd.DataFrame = None):
         """
         Analisar como estratégias mudam ao longo do tempo
+
+        Sem ads_df, usa o engine (DuckDBEngine.trends_over_time).
         """
+        if ads_df is None:
+            if self.engine is None:
+                raise ValueError("analyze_trends_over_time requer ads_df ou um engine")
+            return self.engine.trends_over_time()
+
+        if isinstance(ads_df, pa.Table):
+            ads_df = table_to_pandas(ads_df)
 
         ads_df['month'] = pd.to_datetime(ads_df['start_date']).dt.to_period('M')
 
@@ -68,3 +94,51 @@ class AdvancedAnalyzer:
         })
 
         return trends
+
+    def analyze_trends_over_chunks(self, chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """
+        analyze_trends_over_time dobrado sobre chunks (AdDatabase.iter_chunks)
+
+        Por mês só ficam somas e contagens, então a memória não cresce com
+        o corpus. O resultado é o mesmo de analyze_trends_over_time.
+        """
+        totals = None
+        ctas = None
+
+        for chunk in chunks:
+            if isinstance(chunk, pa.Table):
+                chunk = table_to_pandas(chunk)
+            if len(chunk) == 0:
+                continue
+
+            month = pd.to_datetime(chunk['start_date']).dt.to_period('M').rename('month')
+            part = chunk.groupby(month).agg(
+                total_ads=('ad_id', 'count'),
+                rows=('ad_id', 'size'),
+                text_length_sum=('text_length', 'sum'),
+                text_length_count=('text_length', 'count'),
+                emoji=('has_emoji', 'sum'),
+            )
+            cta_part = chunk.groupby([month, 'cta_detected']).size()
+
+            totals = part if totals is None else totals.add(part, fill_value=0)
+            ctas = cta_part if ctas is None else ctas.add(cta_part, fill_value=0)
+
+        if totals is None:
+            return pd.DataFrame(columns=['total_ads', 'avg_text_length', 'emoji_usage_%', 'cta_detected'])
+
+        # Moda por mês; empate fica com o menor valor, como Series.mode()
+        mode = None
+        if ctas is not None and len(ctas):
+            ranked = ctas.rename('count').reset_index().sort_values(
+                ['month', 'count', 'cta_detected'], ascending=[True, False, True]
+            )
+            mode = ranked.drop_duplicates('month').set_index('month')['cta_detected']
+
+        trends = pd.DataFrame({
+            'total_ads': totals['total_ads'].astype('int64'),
+            'avg_text_length': totals['text_length_sum'] / totals['text_length_count'],
+            'emoji_usage_%': (totals['emoji'] / totals['rows']) * 100,
+        })
+        trends['cta_detected'] = mode.reindex(trends.index) if mode is not None else None
+        return trends.sort_index()
@@ -0,0 +1,301 @@
+# analyzers/duckdb_engine.py
+import os
+from typing import Dict, List
+import pandas as pd
+from sqlalchemy import Boolean, DateTime, Integer
+from src.analyzers.ad_analyzer import AdAnalyzer
+from src.config import Config
+from src.storage.database import CREATIVE_COLUMNS, Ad
+from src.storage.parquet_archive import ADS_SCHEMA, ParquetArchive
+
+
+def _sql_type(column_type) -> str:
+    if isinstance(column_type, DateTime):
+        return 'TIMESTAMP'
+    if isinstance(column_type, Boolean):
+        return 'BOOLEAN'
+    if isinstance(column_type, Integer):
+        return 'BIGINT'
+    return 'VARCHAR'
+
+
+def _sql_literal(value: str) -> str:
+    """Literal de string SQL (aspas simples dobradas)"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _sqlite_view() -> str:
+    """View `ads` sobre o SQLite anexado: texto de creatives e tipos convertidos"""
+    columns = []
+    for column in Ad.__table__.columns:
+        sql_type = _sql_type(column.type)
+        expression = f'CAST(a.{column.name} AS {sql_type})'
+        if column.name in CREATIVE_COLUMNS:
+            expression = f'COALESCE({expression}, CAST(c.{column.name} AS {sql_type}))'
+        columns.append(f'{expression} AS {column.name}')
+
+    return (
+        'CREATE VIEW ads AS SELECT ' + ', '.join(columns)
+        + ' FROM store.ads a LEFT JOIN store.creatives c ON a.creative_hash = c.creative_hash'
+    )
+
+
+class DuckDBEngine:
+    """
+    Conexão DuckDB com uma view `ads` sobre o SQLite ou o arquivo Parquet
+
+    As agregações rodam como SQL dentro do DuckDB (colunar, em paralelo) e
+    só o resultado volta para o pandas. Opcional: requer `pip install
+    duckdb`; ler o SQLite usa a extensão sqlite do DuckDB.
+
+    Use como context manager (ou chame close()) para liberar a conexão e o
+    ATTACH do database.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = None) -> 'DuckDBEngine':
+        """Engine sobre o database SQLite (somente leitura)"""
+        connection = cls._connect()
+        import duckdb
+
+        try:
+            try:
+                connection.execute('INSTALL sqlite')
+                connection.execute('LOAD sqlite')
+            except duckdb.Error as e:
+                raise RuntimeError(
+                    f"Extensão sqlite do DuckDB indisponível ({e}); use DuckDBEngine.from_parquet"
+                ) from e
+
+            # ATTACH não aceita parâmetro: o caminho vai como literal SQL escapado
+            connection.execute(f"ATTACH {_sql_literal(db_path or Config.DB_PATH)} AS store (TYPE sqlite, READ_ONLY)")
+            connection.execute(_sqlite_view())
+        except BaseException:
+            connection.close()
+            raise
+        return cls(connection)
+
+    @classmethod
+    def from_parquet(cls, root: str = None) -> 'DuckDBEngine':
+        """Engine sobre o arquivo Parquet (filtros e projeção descem para o scan)"""
+        archive = ParquetArchive(root)
+        connection = cls._connect()
+        if os.path.isdir(archive.ads_path):
+            connection.register('ads_archive', archive.dataset())
+        else:
+            connection.register('ads_archive', ADS_SCHEMA.empty_table())
+        connection.execute('CREATE VIEW ads AS SELECT * FROM ads_archive')
+        return cls(connection)
+
+    @staticmethod
+    def _connect():
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("Engine DuckDB requer o pacote duckdb (pip install duckdb)") from e
+        return duckdb.connect()
+
+    def query(self, sql: str, params: list = None) -> pd.DataFrame:
+        return _pandas_dtypes(self.connection.execute(sql, params or []).df())
+
+    def scalar(self, sql: str, params: list = None):
+        return self.connection.execute(sql, params or []).fetchone()[0]
+
+    def trends_over_time(self) -> pd.DataFrame:
+        """Tendências mensais (ver AdvancedAnalyzer.analyze_trends_over_time)"""
+        trends = self.query(
+            "WITH monthly AS (SELECT *, date_trunc('month', start_date) AS month FROM ads WHERE start_date IS NOT NULL),"
+            ' ctas AS ('
+            '  SELECT month, cta_detected, row_number() OVER ('
+            '   PARTITION BY month ORDER BY count(*) DESC, cta_detected'
+            '  ) AS rank FROM monthly WHERE cta_detected IS NOT NULL'
+            '  GROUP BY month, cta_detected'
+            ' )'
+            ' SELECT m.month, count(m.ad_id) AS total_ads,'
+            ' avg(m.text_length) AS avg_text_length,'
+            ' count(*) FILTER (WHERE m.has_emoji) / count(*) * 100 AS "emoji_usage_%",'
+            ' any_value(c.cta_detected) AS cta_detected'
+            ' FROM monthly m LEFT JOIN ctas c ON c.month = m.month AND c.rank = 1'
+            ' GROUP BY m.month ORDER BY m.month'
+        )
+        trends['month'] = pd.to_datetime(trends['month']).dt.to_period('M')
+        return _as_float(trends.set_index('month'), ['avg_text_length', 'emoji_usage_%'])
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'DuckDBEngine':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DuckDBAdAnalyzer(AdAnalyzer):
+    """
+    AdAnalyzer com as agregações em SQL no DuckDB
+
+    Nenhuma linha de ad é carregada no Python: cada método devolve só o
+    resultado agregado, no mesmo formato do AdAnalyzer. Empates (CTAs,
+    palavras com a mesma contagem) podem sair em outra ordem.
+    """
+
+    def __init__(self, engine: DuckDBEngine):
+        self.df = None
+        self.engine = engine
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = None) -> 'DuckDBAdAnalyzer':
+        return cls(DuckDBEngine.from_sqlite(db_path))
+
+    @classmethod
+    def from_parquet(cls, root: str = None) -> 'DuckDBAdAnalyzer':
+        return cls(DuckDBEngine.from_parquet(root))
+
+    def close(self):
+        self.engine.close()
+
+    def __enter__(self) -> 'DuckDBAdAnalyzer':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def total_ads(self) -> int:
+        return self.engine.scalar('SELECT count(*) FROM ads')
+
+    def get_top_performers(self, min_days: int = 30, top_n: int = 10) -> pd.DataFrame:
+        # Empate em days_active: o ad mais antigo primeiro, como nlargest
+        return self.engine.query(
+            'SELECT page_name, days_active, body, headline, cta_detected FROM ads'
+            ' WHERE days_active >= ? ORDER BY days_active DESC, id LIMIT ?',
+            [min_days, top_n]
+        )
+
+    def analyze_cta_distribution(self) -> pd.Series:
+        counts = self.engine.query(
+            'SELECT cta_detected, count(*) AS count FROM ads'
+            ' WHERE cta_detected IS NOT NULL GROUP BY cta_detected ORDER BY count DESC, cta_detected'
+        )
+        return counts.set_index('cta_detected')['count'].astype('int64')
+
+    def analyze_text_patterns(self) -> Dict:
+        row = self.engine.query(
+            'SELECT avg(text_length) AS avg_text_length,'
+            ' median(text_length) AS median_text_length,'
+            ' count(*) FILTER (WHERE has_emoji) / count(*) * 100 AS emoji_usage,'
+            ' count(*) FILTER (WHERE has_hashtags) / count(*) * 100 AS hashtag_usage'
+            ' FROM ads'
+        ).iloc[0]
+        return {key: float(value) if pd.notna(value) else float('nan') for key, value in row.items()}
+
+    def get_most_common_words(self, top_n: int = 50, min_length: int = 4) -> List[tuple]:
+        # [\p{L}\p{N}_] é o \w do Python (str.isalnum() ou '_')
+        words = self.engine.query(
+            'SELECT word, count(*) AS count FROM ('
+            "  SELECT unnest(regexp_extract_all(lower(full_text), '[\\p{L}\\p{N}_]+')) AS word"
+            '  FROM ads WHERE full_text IS NOT NULL'
+            ') WHERE length(word) >= ? AND word NOT IN '
+            "('the', 'and', 'for', 'you', 'your', 'with', 'this',"
+            " 'that', 'from', 'are', 'our', 'can', 'get', 'now')"
+            ' GROUP BY word ORDER BY count DESC, word LIMIT ?',
+            [min_length, top_n]
+        )
+        return [(word, int(count)) for word, count in zip(words['word'], words['count'])]
+
+    def analyze_by_page(self) -> pd.DataFrame:
+        by_page = self.engine.query(
+            'SELECT page_name, count(ad_id) AS total_ads,'
+            ' avg(days_active) AS avg_days_active,'
+            ' count(*) FILTER (WHERE is_active) AS active_ads,'
+            ' avg(text_length) AS avg_text_length,'
+            ' count(*) FILTER (WHERE has_emoji) AS ads_with_emoji'
+            ' FROM ads WHERE page_name IS NOT NULL GROUP BY page_name'
+            ' ORDER BY total_ads DESC'
+        )
+        return _as_float(by_page.set_index('page_name'), ['avg_days_active', 'avg_text_length'])
+
+    def get_successful_patterns(self, min_days: int = 30) -> Dict:
+        summary = self.engine.query(
+            'SELECT count(*) AS count, avg(text_length) AS avg_text_length,'
+            ' count(*) FILTER (WHERE has_emoji) / count(*) * 100 AS emoji_usage_rate,'
+            ' count(*) FILTER (WHERE has_hashtags) / count(*) * 100 AS hashtag_usage_rate'
+            ' FROM ads WHERE days_active >= ?',
+            [min_days]
+        ).iloc[0]
+
+        if summary['count'] == 0:
+            return {}
+
+        ctas = self.engine.query(
+            'SELECT cta_detected, count(*) AS count FROM ads'
+            ' WHERE days_active >= ? AND cta_detected IS NOT NULL'
+            ' GROUP BY cta_detected ORDER BY count DESC, cta_detected LIMIT 5',
+            [min_days]
+        )
+        headlines = self.engine.query(
+            'SELECT headline FROM ads WHERE days_active >= ? AND headline IS NOT NULL ORDER BY id LIMIT 5',
+            [min_days]
+        )
+
+        return {
+            'common_ctas': {cta: int(count) for cta, count in zip(ctas['cta_detected'], ctas['count'])},
+            'avg_text_length': _float(summary['avg_text_length']),
+            'emoji_usage_rate': _float(summary['emoji_usage_rate']),
+            'hashtag_usage_rate': _float(summary['hashtag_usage_rate']),
+            'sample_headlines': headlines['headline'].tolist()
+        }
+
+    def compare_competitors(self, pages: List[str]) -> pd.DataFrame:
+        comparison = self.engine.query(
+            'WITH page_ads AS (SELECT * FROM ads WHERE list_contains(?, page_name)),'
+            ' ctas AS ('
+            '  SELECT page_name, cta_detected, row_number() OVER ('
+            '   PARTITION BY page_name ORDER BY count(*) DESC, cta_detected'
+            '  ) AS rank FROM page_ads WHERE cta_detected IS NOT NULL'
+            '  GROUP BY page_name, cta_detected'
+            ' )'
+            ' SELECT p.page_name AS page, count(*) AS total_ads,'
+            ' count(*) FILTER (WHERE p.is_active) AS active_ads,'
+            ' avg(p.days_active) AS avg_days_active,'
+            ' any_value(c.cta_detected) AS most_common_cta,'
+            ' count(*) FILTER (WHERE p.has_emoji) / count(*) * 100 AS "emoji_usage_%",'
+            ' avg(p.text_length) AS avg_text_length'
+            ' FROM page_ads p LEFT JOIN ctas c ON c.page_name = p.page_name AND c.rank = 1'
+            ' GROUP BY p.page_name ORDER BY total_ads DESC',
+            [list(pages)]
+        )
+        return _as_float(comparison, ['avg_days_active', 'emoji_usage_%', 'avg_text_length'])
+
+
+def _float(value) -> float:
+    return float(value) if pd.notna(value) else float('nan')
+
+
+def _pandas_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dtypes do DuckDB para os que o pandas produziria nas mesmas análises
+
+    Inteiros/booleanos nuláveis viram int64/bool ou float64/object com
+    NaN; texto só com NULL vira str.
+    """
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.BooleanDtype):
+            df[column] = values.astype('object').where(values.notna(), None) if values.hasnans else values.astype('bool')
+        elif isinstance(values.dtype, (pd.Int64Dtype, pd.Int32Dtype, pd.Float64Dtype)):
+            df[column] = values.astype('float64') if values.hasnans else values.astype(values.dtype.numpy_dtype)
+        elif values.dtype == object and values.isna().all():
+            df[column] = values.astype('str')
+    return df
+
+
+def _as_float(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Médias e percentuais em float64 (NaN), como no pandas"""
+    for column in columns:
+        df[column] = df[column].astype('float64')
+    return df
@@ -0,0 +1,124 @@
+# src/collectors/async_collector.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Tuple
+from src.collectors.meta_api_collector import MetaAdLibraryAPI
+from src.config import Config
+
+
+class AsyncMetaAdLibraryAPI:
+    """
+    Coletor assíncrono para Meta Ad Library API
+
+    Executa várias cadeias de paginação (keyword × país) ao mesmo tempo.
+    Todas compartilham o rate limiter do MetaAdLibraryAPI, então o tempo
+    total fica limitado pela quota e não pela soma das requisições.
+    """
+
+    def __init__(self, api: MetaAdLibraryAPI = None, max_concurrency: int = None):
+        self.api = api or MetaAdLibraryAPI()
+        self.max_concurrency = max_concurrency or Config.API_MAX_CONCURRENCY
+
+    async def search_many(
+        self,
+        keywords: List[str],
+        countries: List[str] = ['US'],
+        platforms: List[str] = ['instagram'],
+        limit: int = 100,
+        split_countries: bool = True,
+        keyword_kwargs: Dict[str, Dict] = None,
+        **search_kwargs
+    ) -> AsyncIterator[Tuple[str, List[str], List[Dict]]]:
+        """
+        Buscar ads para várias keywords em paralelo
+
+        Args:
+            keywords: Lista de palavras-chave
+            countries: Lista de códigos de país (ISO 2-letter)
+            platforms: Plataformas (ver MetaAdLibraryAPI.search_ads)
+            limit: Máximo de ads por cadeia de paginação
+            split_countries: Se True, cada país vira uma cadeia separada;
+                se False, cada keyword busca todos os países de uma vez
+            keyword_kwargs: Argumentos extras de search_ads por keyword
+                (ex.: delivery_date_min de cada watermark)
+            **search_kwargs: Repassados para MetaAdLibraryAPI.search_ads
+
+        Yields:
+            Tuplas (keyword, países, ads) na ordem em que terminam
+        """
+
+        if split_countries:
+            jobs = [(keyword, [country]) for keyword in keywords for country in countries]
+        else:
+            jobs = [(keyword, list(countries)) for keyword in keywords]
+
+        if not jobs:
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, len(jobs)),
+            thread_name_prefix='ads-collector'
+        )
+
+        async def run_job(keyword: str, job_countries: List[str]):
+            ads = await loop.run_in_executor(
+                executor,
+                lambda: self.api.search_ads(
+                    search_terms=keyword,
+                    countries=job_countries,
+                    platforms=platforms,
+                    limit=limit,
+                    **search_kwargs,
+                    **(keyword_kwargs or {}).get(keyword, {})
+                )
+            )
+            return keyword, job_countries, ads
+
+        tasks = [asyncio.ensure_future(run_job(*job)) for job in jobs]
+
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Consumidor parou antes do fim: descartar jobs ainda na fila
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def search_many_sync(self, keywords: List[str], **kwargs) -> Dict[str, List[Dict]]:
+        """
+        Versão bloqueante de search_many
+
+        Returns:
+            Dicionário keyword -> lista de ads (países agregados, sem duplicatas)
+        """
+
+        async def collect():
+            results = {keyword: [] for keyword in keywords}
+            seen = {keyword: set() for keyword in keywords}
+
+            async for keyword, _, ads in self.search_many(keywords, **kwargs):
+                for ad in ads:
+                    if ad.get('id') not in seen[keyword]:
+                        seen[keyword].add(ad.get('id'))
+                        results[keyword].append(ad)
+
+            return results
+
+        return asyncio.run(collect())
+
+
+# Exemplo de uso
+if __name__ == '__main__':
+    async def main():
+        collector = AsyncMetaAdLibraryAPI(max_concurrency=4)
+
+        async for keyword, countries, ads in collector.search_many(
+            keywords=['video editing ai', 'ai video editor'],
+            countries=['US', 'BR'],
+            limit=50
+        ):
+            print(f"{keyword} ({','.join(countries)}): {len(ads)} ads")
+
+    asyncio.run(main())
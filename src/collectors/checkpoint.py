@@ -0,0 +1,115 @@
+# src/collectors/checkpoint.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class CheckpointStore:
+    """
+    Checkpoints de paginação para coletas longas
+
+    Para cada job (mesma busca, países, plataformas...) guarda as páginas já
+    baixadas e o cursor `paging.next`. Se a coleta falhar no meio, a próxima
+    execução retoma do último cursor válido sem gastar quota de novo.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int = 24 * 3600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS checkpoints ('
+            ' job_key TEXT PRIMARY KEY,'
+            ' next_url TEXT NOT NULL,'
+            ' pages INTEGER NOT NULL,'
+            ' updated_at REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS checkpoint_pages ('
+            ' job_key TEXT NOT NULL,'
+            ' page_no INTEGER NOT NULL,'
+            ' data TEXT NOT NULL,'
+            ' PRIMARY KEY (job_key, page_no));'
+        )
+
+    @staticmethod
+    def job_key(endpoint: str, **params) -> str:
+        """Chave estável do job (ordem de países/plataformas não importa)"""
+        normalized = {}
+        for name, value in params.items():
+            if isinstance(value, (list, tuple, set)):
+                value = sorted(value)
+            normalized[name] = value
+
+        payload = json.dumps([endpoint, normalized], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def load(self, job_key: str) -> Optional[Tuple[str, int]]:
+        """
+        Retornar (próximo cursor, nº de páginas salvas) ou None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT next_url, pages, updated_at FROM checkpoints WHERE job_key = ?',
+                (job_key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            next_url, pages, updated_at = row
+            if time.time() - updated_at > self.ttl_seconds:
+                # Cursor velho provavelmente expirou na API
+                self._clear(job_key)
+                return None
+
+        return next_url, pages
+
+    def iter_pages(self, job_key: str) -> Iterator[List[Dict]]:
+        """Ads já coletados, uma página por vez"""
+        with self._lock:
+            page_numbers = [
+                page_no for (page_no,) in self._conn.execute(
+                    'SELECT page_no FROM checkpoint_pages WHERE job_key = ? ORDER BY page_no',
+                    (job_key,)
+                )
+            ]
+
+        for page_no in page_numbers:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT data FROM checkpoint_pages WHERE job_key = ? AND page_no = ?',
+                    (job_key, page_no)
+                ).fetchone()
+            if row:
+                yield json.loads(row[0])
+
+    def save_page(self, job_key: str, page_no: int, ads: List[Dict], next_url: str):
+        """Gravar uma página e o cursor seguinte na mesma transação"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO checkpoint_pages (job_key, page_no, data)'
+                ' VALUES (?, ?, ?)',
+                (job_key, page_no, json.dumps(ads))
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO checkpoints (job_key, next_url, pages, updated_at)'
+                ' VALUES (?, ?, ?, ?)',
+                (job_key, next_url, page_no, time.time())
+            )
+
+    def clear(self, job_key: str):
+        """Remover checkpoint de um job concluído"""
+        with self._lock:
+            self._clear(job_key)
+
+    def _clear(self, job_key: str):
+        with self._conn:
+            self._conn.execute('DELETE FROM checkpoint_pages WHERE job_key = ?', (job_key,))
+            self._conn.execute('DELETE FROM checkpoints WHERE job_key = ?', (job_key,))
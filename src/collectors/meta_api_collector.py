@@ -1,19 +1,127 @@
 # src/collectors/meta_api_collector.py
+import json
+import random
 import requests
 import time
-from typing import List, Dict, Optional
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Callable, Iterator, List, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.collectors.checkpoint import CheckpointStore
+from src.collectors.rate_limiter import RateLimiter  # noqa: F401 (compatibilidade)
+from src.collectors.response_cache import CacheMissError, ResponseCache
+from src.collectors.token_pool import TokenPool
 from src.config import Config
 
 
+# Perfis de campos: cada etapa pede só o que usa (menos JSON por página)
+FIELD_PROFILES = {
+    # Detecção de ads novos (monitor_with_alerts)
+    'monitor': [
+        'id',
+        'page_name',
+        'page_id',
+        'ad_delivery_start_time',
+        'ad_creative_link_titles'
+    ],
+    # Status/longevidade de ads já conhecidos
+    'lifecycle': [
+        'id',
+        'page_name',
+        'page_id',
+        'ad_delivery_start_time',
+        'ad_delivery_stop_time'
+    ],
+    # Tudo que o AdParser usa
+    'full': [
+        'id',
+        'ad_creative_bodies',
+        'ad_creative_link_captions',
+        'ad_creative_link_titles',
+        'ad_creative_link_descriptions',
+        'ad_delivery_start_time',
+        'ad_delivery_stop_time',
+        'ad_snapshot_url',
+        'page_name',
+        'page_id',
+        'platforms',
+        'publisher_platforms'
+    ]
+}
+
+
+def resolve_fields(fields: List[str] = None, field_profile: str = 'full') -> List[str]:
+    """Lista explícita de campos ou a do perfil nomeado"""
+    if fields is not None:
+        return list(fields)
+    if field_profile not in FIELD_PROFILES:
+        raise ValueError(
+            f"Perfil de campos desconhecido: {field_profile} "
+            f"(use {', '.join(FIELD_PROFILES)})"
+        )
+    return list(FIELD_PROFILES[field_profile])
+
+
+class AdPage(NamedTuple):
+    """Uma página de resultados da Ad Library"""
+    ads: List[Dict]
+    cursor: Optional[str]  # próxima URL (sem access_token) ou None na última página
+    page_number: int
+
+
 class MetaAdLibraryAPI:
     """
     Cliente para Meta Ad Library API
     """
 
-    def __init__(self, access_token: str = None):
-        self.access_token = access_token or Config.FB_ACCESS_TOKEN
+    # Erros transitórios que valem nova tentativa
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+    BATCH_SIZE = 50  # máximo de sub-requests por chamada batch da Graph API
+    # Erros que outro token (ou o mesmo, mais tarde) pode resolver
+    TOKEN_ERROR_CODES = TokenPool.EXPIRED_CODES | TokenPool.PERMISSION_CODES | TokenPool.THROTTLE_CODES
+
+    def __init__(
+        self,
+        access_token: str = None,
+        pool_size: int = None,
+        checkpoint_store: CheckpointStore = None,
+        response_cache: ResponseCache = None,
+        access_tokens: List[str] = None
+    ):
+        """
+        Args:
+            access_token: Token único (padrão: Config.FB_ACCESS_TOKEN)
+            access_tokens: Vários tokens (um por app); cada um tem seu
+                próprio orçamento de rate limit (padrão: Config.FB_ACCESS_TOKENS)
+        """
+        if not access_tokens:
+            access_tokens = [access_token] if access_token else (
+                Config.FB_ACCESS_TOKENS or [Config.FB_ACCESS_TOKEN]
+            )
+
+        self.tokens = TokenPool(
+            access_tokens,
+            Config.API_RATE_LIMIT,
+            state_path=Config.RATE_LIMIT_STATE_PATH
+        )
+        primary = self.tokens.tokens[0] if self.tokens.tokens else None
+        self.access_token = primary.token if primary else None
+        self.rate_limiter = primary.limiter if primary else None
         self.base_url = Config.FB_BASE_URL
-        self.rate_limiter = RateLimiter(Config.API_RATE_LIMIT)
+        self.session = self._create_session(pool_size or Config.API_POOL_SIZE)
+
+        if checkpoint_store is None and Config.CHECKPOINT_PATH:
+            checkpoint_store = CheckpointStore(Config.CHECKPOINT_PATH, Config.CHECKPOINT_TTL)
+        self.checkpoints = checkpoint_store
+
+        if response_cache is None and Config.RESPONSE_CACHE_PATH:
+            response_cache = ResponseCache(
+                Config.RESPONSE_CACHE_PATH,
+                ttl_seconds=Config.RESPONSE_CACHE_TTL,
+                max_bytes=Config.RESPONSE_CACHE_MAX_BYTES,
+                mode=Config.RESPONSE_CACHE_MODE
+            )
+        self.cache = response_cache
 
     def search_ads(
         self,
@@ -23,7 +131,11 @@ class MetaAdLibraryAPI:
         ad_reached_countries: List[str] = None,
         platforms: List[str] = ['instagram'],
         fields: List[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        resume: bool = True,
+        delivery_date_min: str = None,
+        stop_when_known: Callable[[List[str]], bool] = None,
+        field_profile: str = 'full'
     ) -> List[Dict]:
         """
         Buscar ads na Ad Library
@@ -33,31 +145,61 @@ class MetaAdLibraryAPI:
             countries: Lista de códigos de país (ISO 2-letter)
             ad_active_status: 'ACTIVE', 'INACTIVE', 'ALL'
             platforms: 'facebook', 'instagram', 'messenger', 'audience_network'
-            fields: Campos a retornar
+            fields: Campos a retornar (tem prioridade sobre field_profile)
             limit: Máximo de ads a retornar
+            resume: Retomar do checkpoint se uma coleta anterior falhou
+            delivery_date_min: Só ads entregues a partir desta data (YYYY-MM-DD)
+            stop_when_known: Função que recebe os ad_ids de uma página e
+                retorna True se todos já são conhecidos; a paginação para
+                depois dessa página (coleta incremental)
+            field_profile: Perfil de FIELD_PROFILES ('monitor', 'lifecycle', 'full')
 
         Returns:
             Lista de dicionários com dados dos ads
         """
+        all_ads = []
+        for page in self.search_ads_iter(
+            search_terms,
+            countries=countries,
+            ad_active_status=ad_active_status,
+            platforms=platforms,
+            fields=fields,
+            limit=limit,
+            resume=resume,
+            delivery_date_min=delivery_date_min,
+            stop_when_known=stop_when_known,
+            field_profile=field_profile
+        ):
+            all_ads.extend(page.ads)
+
+        return all_ads
+
+    def search_ads_iter(
+        self,
+        search_terms: str,
+        countries: List[str] = ['US'],
+        ad_active_status: str = 'ALL',
+        platforms: List[str] = ['instagram'],
+        fields: List[str] = None,
+        limit: int = 100,
+        resume: bool = True,
+        delivery_date_min: str = None,
+        stop_when_known: Callable[[List[str]], bool] = None,
+        field_profile: str = 'full'
+    ) -> Iterator['AdPage']:
+        """
+        Versão streaming de search_ads: gera uma página por vez
 
-        if fields is None:
-            fields = [
-                'id',
-                'ad_creative_bodies',
-                'ad_creative_link_captions',
-                'ad_creative_link_titles',
-                'ad_creative_link_descriptions',
-                'ad_delivery_start_time',
-                'ad_delivery_stop_time',
-                'ad_snapshot_url',
-                'page_name',
-                'page_id',
-                'platforms',
-                'publisher_platforms'
-            ]
+        Permite processar/salvar cada página enquanto a próxima é baixada,
+        com memória limitada a ~1 página. Argumentos iguais a search_ads.
+
+        Yields:
+            AdPage(ads, cursor, page_number)
+        """
+
+        fields = resolve_fields(fields, field_profile)
 
         params = {
-            'access_token': self.access_token,
             'search_terms': search_terms,
             'ad_reached_countries': ','.join(countries),
             'ad_active_status': ad_active_status,
@@ -68,112 +210,435 @@ class MetaAdLibraryAPI:
         if platforms:
             params['publisher_platforms'] = ','.join(platforms)
 
-        all_ads = []
-        url = f"{self.base_url}/ads_archive"
-
-        while len(all_ads) < limit:
-            # Rate limiting
-            self.rate_limiter.wait_if_needed()
+        if delivery_date_min:
+            params['ad_delivery_date_min'] = delivery_date_min
 
-            try:
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+        url = f"{self.base_url}/ads_archive"
 
-                ads = data.get('data', [])
-                all_ads.extend(ads)
+        job_key = None
+        if resume and self.checkpoints:
+            job_key = CheckpointStore.job_key(
+                'ads_archive',
+                search_terms=search_terms,
+                countries=countries,
+                platforms=platforms or [],
+                ad_active_status=ad_active_status,
+                fields=fields,
+                delivery_date_min=delivery_date_min
+            )
 
-                # Pagination
-                if 'paging' in data and 'next' in data['paging']:
-                    url = data['paging']['next']
-                    params = {}  # Next URL já tem todos os params
-                else:
-                    break
-
-            except requests.exceptions.RequestException as e:
-                print(f"Erro na requisição: {e}")
-                break
-
-        return all_ads[:limit]
+        return self._iter_pages(url, params, limit, job_key, stop_when_known)
 
     def get_ads_by_page(
         self,
         page_id: str,
         fields: List[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        resume: bool = True,
+        field_profile: str = 'full'
     ) -> List[Dict]:
         """
         Buscar todos os ads de uma página específica
         """
+        all_ads = []
+        for page in self.get_ads_by_page_iter(
+            page_id, fields=fields, limit=limit, resume=resume, field_profile=field_profile
+        ):
+            all_ads.extend(page.ads)
+
+        return all_ads
+
+    def get_ads_by_page_iter(
+        self,
+        page_id: str,
+        fields: List[str] = None,
+        limit: int = 100,
+        resume: bool = True,
+        field_profile: str = 'full'
+    ) -> Iterator['AdPage']:
+        """
+        Versão streaming de get_ads_by_page: gera uma página por vez
+        """
 
-        if fields is None:
-            fields = self._get_default_fields()
+        fields = resolve_fields(fields, field_profile)
 
         params = {
-            'access_token': self.access_token,
             'fields': ','.join(fields),
             'limit': min(limit, 100)
         }
 
         url = f"{self.base_url}/{page_id}/ads_archive"
 
-        all_ads = []
+        job_key = None
+        if resume and self.checkpoints:
+            job_key = CheckpointStore.job_key('page_ads_archive', page_id=page_id, fields=fields)
 
-        while len(all_ads) < limit:
-            self.rate_limiter.wait_if_needed()
+        return self._iter_pages(url, params, limit, job_key)
 
-            try:
-                response = requests.get(url, params=params, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+    def get_ads_by_pages(
+        self,
+        page_ids: List[str],
+        fields: List[str] = None,
+        limit: int = 100,
+        field_profile: str = 'full'
+    ) -> Dict[str, List[Dict]]:
+        """
+        Buscar ads de várias páginas com requests batch da Graph API
+
+        Junta até BATCH_SIZE páginas (ou cursores de continuação) numa
+        única chamada HTTP e separa as respostas por página. Cada
+        sub-request conta como uma chamada no rate limit, mas o número de
+        round-trips cai até BATCH_SIZE vezes. Sub-requests com erro
+        transitório, rate limit ou erro de token voltam para a fila (com
+        backoff) e só a página afetada é descartada quando as tentativas
+        acabam. Só erros do token (expirado, sem permissão, rate limit do
+        app fora de um 429) tiram o token da vez no pool. Não usa
+        checkpoints: uma falha da chamada batch inteira interrompe todas as
+        páginas pendentes.
 
-                ads = data.get('data', [])
-                all_ads.extend(ads)
+        Args:
+            page_ids: IDs das páginas
+            fields: Campos a retornar (ou field_profile)
+            limit: Máximo de ads por página
+            field_profile: Perfil de campos (ver FIELD_PROFILES)
+
+        Returns:
+            Dicionário page_id -> lista de ads, na ordem de `page_ids`
+        """
+
+        fields = resolve_fields(fields, field_profile)
+        query = urlencode({'fields': ','.join(fields), 'limit': min(limit, 100)})
+
+        results = {page_id: [] for page_id in page_ids}
+        pending = {page_id: f"{page_id}/ads_archive?{query}" for page_id in results}
+        retries = {page_id: 0 for page_id in results}
+        # Um batch não pode custar mais que o bucket inteiro do rate limiter
+        batch_size = max(1, min(self.BATCH_SIZE, Config.API_RATE_LIMIT))
+
+        while pending:
+            batch = list(pending.items())[:batch_size]
+
+            try:
+                responses = self._batch([relative_url for _, relative_url in batch])
+            except requests.exceptions.RequestException as e:
+                print(f"Erro na requisição batch: {e}")
+                break
 
-                if 'paging' in data and 'next' in data['paging']:
-                    url = data['paging']['next']
-                    params = {}
+            failed = []  # tentativas das páginas que falharam neste batch
+            for (page_id, relative_url), (status, data) in zip(batch, responses):
+                if status != 200 or not isinstance(data, dict):
+                    retries[page_id] += 1
+                    if not self._retryable_sub_response(status, data) or retries[page_id] > Config.API_RETRY_ATTEMPTS:
+                        print(f"Erro na página {page_id} (HTTP {status}); ads parciais mantidos")
+                        del pending[page_id]
+                    else:
+                        failed.append(retries[page_id])
+                    continue
+
+                ads = data.get('data', [])[:limit - len(results[page_id])]
+                results[page_id].extend(ads)
+
+                next_url = data.get('paging', {}).get('next')
+                if next_url and ads and len(results[page_id]) < limit:
+                    pending[page_id] = self._relative_url(next_url)
                 else:
-                    break
+                    del pending[page_id]
 
+            if failed:
+                time.sleep(self._backoff_delay(max(failed) - 1))
+
+        return results
+
+    def _batch(self, relative_urls: List[str]) -> List[Tuple[Optional[int], Optional[Dict]]]:
+        """
+        Executar GETs relativos a base_url numa chamada batch
+
+        Sub-requests já em cache não vão para a API. Returns: lista de
+        (status HTTP, corpo JSON ou None) na ordem de `relative_urls`;
+        status None indica sub-request sem resposta (timeout da Graph API).
+        """
+        results = [None] * len(relative_urls)
+        to_fetch = []
+
+        for index, relative_url in enumerate(relative_urls):
+            cached = self.cache.get(f"{self.base_url}/{relative_url}") if self.cache else None
+            if cached is not None:
+                results[index] = (200, cached)
+            elif self.cache and self.cache.replay_only:
+                raise CacheMissError(f"Resposta não gravada: {self.base_url}/{relative_url}")
+            else:
+                to_fetch.append(index)
+
+        if to_fetch:
+            payload = {
+                'batch': json.dumps([
+                    {'method': 'GET', 'relative_url': relative_urls[index]} for index in to_fetch
+                ]),
+                'include_headers': 'false'
+            }
+            responses, token = self._send('POST', self.base_url, data=payload, cost=len(to_fetch))
+
+            token_error = None
+            for index, response in zip(to_fetch, responses):
+                if not response:
+                    results[index] = (None, None)
+                    continue
+
+                status = response.get('code')
+                try:
+                    body = json.loads(response.get('body') or 'null')
+                except ValueError:
+                    body = None
+
+                results[index] = (status, body)
+                if status == 200 and isinstance(body, dict):
+                    if self.cache:
+                        self.cache.put(f"{self.base_url}/{relative_urls[index]}", None, body)
+                elif token_error is None and self._token_error(status, body):
+                    token_error = _body_error_code(body)
+
+            # Erro do token num sub-request: tirar o token da vez. 429 é
+            # transitório da página e fica só no retry com backoff
+            if token_error is not None:
+                self.tokens.report_error(token, token_error)
+
+        return results
+
+    @staticmethod
+    def _token_error(status: Optional[int], body: Optional[Dict]) -> bool:
+        """Sub-resposta com erro do token (expirado, sem permissão ou rate limit do app fora de um 429)"""
+        code = _body_error_code(body)
+        if code in TokenPool.EXPIRED_CODES or code in TokenPool.PERMISSION_CODES:
+            return True
+        return code in TokenPool.THROTTLE_CODES and status != 429
+
+    def _retryable_sub_response(self, status: Optional[int], body: Optional[Dict]) -> bool:
+        """Sub-request do batch que vale repetir (transitório, corpo ilegível, rate limit ou token)"""
+        if status is None or status in self.RETRYABLE_STATUS:
+            return True
+        if status == 200:
+            return True  # corpo ilegível
+        return _body_error_code(body) in self.TOKEN_ERROR_CODES
+
+    def _relative_url(self, url: str) -> str:
+        """URL de paginação relativa a base_url, sem token (para o batch)"""
+        parts = urlsplit(_strip_access_token(url))
+        base_path = urlsplit(self.base_url).path.rstrip('/')
+        path = parts.path
+        if base_path and path.startswith(base_path + '/'):
+            path = path[len(base_path):]
+        return f"{path.lstrip('/')}?{parts.query}" if parts.query else path.lstrip('/')
+
+    def _iter_pages(
+        self,
+        url: str,
+        params: Dict,
+        limit: int,
+        job_key: Optional[str] = None,
+        stop_when_known: Callable[[List[str]], bool] = None
+    ) -> Iterator['AdPage']:
+        """
+        Seguir `paging.next` até `limit` ads, com checkpoint por página
+
+        Se existir checkpoint para `job_key`, primeiro gera as páginas salvas
+        e depois retoma do último cursor. O checkpoint só é removido quando a
+        paginação termina; se parar por erro (ou o consumidor abandonar o
+        iterador), a próxima execução continua de onde parou.
+
+        Com `stop_when_known`, a paginação termina depois da primeira página
+        em que todos os ads já estão salvos.
+        """
+        total = 0
+        page_no = 0
+
+        if job_key:
+            saved = self.checkpoints.load(job_key)
+            if saved:
+                url, page_no = saved
+                params = {}
+                print(f"Retomando do checkpoint: {page_no} páginas já coletadas")
+
+                for number, ads in enumerate(self.checkpoints.iter_pages(job_key), 1):
+                    ads = ads[:limit - total]
+                    total += len(ads)
+                    yield AdPage(ads, url if number == page_no else None, number)
+                    if total >= limit:
+                        break
+
+        complete = True
+
+        while total < limit:
+            try:
+                data = self._get(url, params)
             except requests.exceptions.RequestException as e:
-                print(f"Erro: {e}")
+                print(f"Erro na requisição: {e}")
+                complete = False
                 break
 
-        return all_ads[:limit]
+            ads = data.get('data', [])[:limit - total]
+            total += len(ads)
+            page_no += 1
 
-    def _get_default_fields(self) -> List[str]:
-        return [
-            'id', 'ad_creative_bodies', 'ad_creative_link_captions',
-            'ad_creative_link_titles', 'ad_delivery_start_time',
-            'ad_snapshot_url', 'page_name', 'platforms'
-        ]
+            # Checar antes de entregar a página (o consumidor pode salvá-la)
+            all_known = bool(ads) and stop_when_known is not None and stop_when_known(
+                [ad.get('id') for ad in ads]
+            )
 
+            # Pagination
+            if all_known:
+                yield AdPage(ads, None, page_no)
+                break
+            elif 'paging' in data and 'next' in data['paging']:
+                # Cursor salvo sem token; _get envia o token escolhido no pool
+                url = _strip_access_token(data['paging']['next'])
+                params = {}
+                if job_key:
+                    self.checkpoints.save_page(job_key, page_no, ads, url)
+                yield AdPage(ads, url, page_no)
+            else:
+                yield AdPage(ads, None, page_no)
+                break
 
-class RateLimiter:
-    """
-    Controle de rate limiting para API
-    """
+        if job_key and complete:
+            self.checkpoints.clear(job_key)
+
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """Sessão HTTP com conexões keep-alive reaproveitadas entre páginas"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0  # retries são feitos em _get, passando pelo rate limiter
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        return session
+
+    def _get(self, url: str, params: Dict) -> Dict:
+        """
+        GET com cache, rate limiting, pool de tokens e retry
+
+        Respostas em cache não gastam quota; o resto passa por _request.
+        """
+        if self.cache:
+            cached = self.cache.get(url, params)
+            if cached is not None:
+                return cached
+            if self.cache.replay_only:
+                raise CacheMissError(f"Resposta não gravada: {ResponseCache.normalize(url, params)}")
+
+        data = self._request('GET', url, params=params)
+
+        if self.cache:
+            self.cache.put(url, params, data)
 
-    def __init__(self, max_requests_per_hour: int):
-        self.max_requests = max_requests_per_hour
-        self.requests = []
+        return data
+
+    def _request(self, method: str, url: str, params: Dict = None, data: Dict = None, cost: int = 1):
+        """
+        Request com rate limiting, pool de tokens e retry
+
+        Cada tentativa usa o token do pool com mais orçamento (consumindo
+        `cost` requests dele); erros de token (expirado, sem permissão,
+        rate limit do app) passam a request para outro token. Erros
+        transitórios (timeout, conexão, 429, 5xx) são repetidos até
+        Config.API_RETRY_ATTEMPTS vezes, com backoff exponencial + jitter
+        ou o tempo indicado em Retry-After.
+        """
+        return self._send(method, url, params, data, cost)[0]
+
+    def _send(self, method: str, url: str, params: Dict = None, data: Dict = None, cost: int = 1):
+        """_request que devolve também o token usado: (JSON, PooledToken)"""
+        attempts = Config.API_RETRY_ATTEMPTS
+        attempt = 0
+        failovers = 0
+
+        while True:
+            token = self.tokens.acquire(cost)
+
+            # GET leva o token na query; POST (batch) no corpo do formulário
+            if data is None:
+                request_kwargs = {'params': {**(params or {}), 'access_token': token.token}}
+            else:
+                request_kwargs = {'params': params, 'data': {**data, 'access_token': token.token}}
+
+            try:
+                response = self.session.request(method, url, timeout=Config.API_TIMEOUT, **request_kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                self.tokens.report_failure(token)
+                if attempt >= attempts:
+                    raise
+                delay = self._backoff_delay(attempt)
+                attempt += 1
+                print(f"Erro de conexão ({e.__class__.__name__}). Tentando novamente em {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            token.limiter.update_from_headers(response.headers)
+
+            if response.status_code in self.RETRYABLE_STATUS and attempt < attempts:
+                self.tokens.report_failure(token)
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                attempt += 1
+                print(f"HTTP {response.status_code}. Tentando novamente em {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+
+            # Token expirado/sem permissão/em rate limit: tentar com outro do pool
+            if response.status_code in (400, 401, 403) and failovers < len(self.tokens):
+                if self.tokens.report_error(token, self._error_code(response), self._retry_after(response)):
+                    failovers += 1
+                    continue
+
+            response.raise_for_status()
+            self.tokens.report_success(token)
+            return response.json(), token
+
+    def _error_code(self, response: requests.Response) -> Optional[int]:
+        """Código do erro da Graph API no corpo da resposta"""
+        try:
+            return response.json().get('error', {}).get('code')
+        except (ValueError, AttributeError):
+            return None
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter (metade fixa + metade aleatória)"""
+        delay = min(Config.API_RETRY_MAX_DELAY, Config.API_RETRY_DELAY * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """Segundos indicados pelo header Retry-After (número ou data HTTP)"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _get_default_fields(self) -> List[str]:
+        return resolve_fields(field_profile='full')
 
-    def wait_if_needed(self):
-        now = time.time()
 
-        # Remover requests antigas (mais de 1h)
-        self.requests = [r for r in self.requests if now - r < 3600]
+def _body_error_code(body) -> Optional[int]:
+    """Código de erro da Graph API num corpo JSON já decodificado"""
+    if isinstance(body, dict) and isinstance(body.get('error'), dict):
+        return body['error'].get('code')
+    return None
 
-        if len(self.requests) >= self.max_requests:
-            # Calcular quanto tempo esperar
-            oldest = self.requests[0]
-            wait_time = 3600 - (now - oldest) + 1
-            print(f"Rate limit atingido. Aguardando {wait_time:.0f}s...")
-            time.sleep(wait_time)
-            self.requests = []
 
-        self.requests.append(now)
+def _strip_access_token(url: str) -> str:
+    """Remover access_token da query string (cursor seguro para persistir)"""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != 'access_token']
+    return urlunsplit(parts._replace(query=urlencode(query)))
 
 
 # Exemplo de uso
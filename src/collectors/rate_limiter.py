@@ -0,0 +1,271 @@
+# src/collectors/rate_limiter.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional
+
+
+class RateLimiter:
+    """
+    Controle de rate limiting para API (token bucket)
+
+    O balde tem capacidade de `max_requests_per_hour` tokens e é reabastecido
+    continuamente, então cada request custa O(1) e a espera é só até o
+    próximo token. A taxa se adapta aos headers de uso da Meta
+    (x-app-usage / x-business-use-case-usage). Com `state_path`, o estado
+    fica num SQLite compartilhado entre processos (scheduler + execuções
+    manuais usam o mesmo orçamento).
+    """
+
+    # Acima deste % de uso reportado pela API, a taxa começa a cair
+    USAGE_THROTTLE_START = 50.0
+    # Fração mínima da taxa nominal enquanto a API não bloqueia
+    MIN_USAGE_FACTOR = 0.05
+
+    def __init__(
+        self,
+        max_requests_per_hour: int,
+        state_path: Optional[str] = None,
+        bucket: str = 'default'
+    ):
+        self.max_requests = max_requests_per_hour
+        self.capacity = float(max_requests_per_hour)
+        self.refill_rate = max_requests_per_hour / 3600.0  # tokens por segundo
+        self.bucket = bucket
+        self._lock = threading.Lock()
+        self._store = _SQLiteStateStore(state_path) if state_path else _MemoryStateStore()
+
+    def wait_if_needed(self, tokens: int = 1):
+        """Bloquear até haver `tokens` disponíveis e consumi-los"""
+        while True:
+            wait_time = self._try_acquire(tokens)
+            if wait_time <= 0:
+                return
+
+            if wait_time >= 5:
+                print(f"Rate limit atingido. Aguardando {wait_time:.0f}s...")
+            time.sleep(wait_time)
+
+    def available(self) -> float:
+        """Tokens disponíveis agora (sem consumir)"""
+        with self._lock, self._store.transaction():
+            state = self._refill(self._load(), time.time())
+            if state['blocked_until'] > state['updated_at']:
+                return 0.0
+            return state['tokens']
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Ajustar a taxa de acordo com o uso reportado pela API
+
+        Headers usados:
+            x-app-usage: {"call_count": %, "total_cputime": %, "total_time": %}
+            x-business-use-case-usage: {"<id>": [{..., "estimated_time_to_regain_access": min}]}
+        """
+        usage_pct, regain_minutes = parse_usage_headers(headers)
+        if usage_pct is None and not regain_minutes:
+            return
+
+        now = time.time()
+
+        with self._lock, self._store.transaction():
+            state = self._refill(self._load(), now)
+
+            if usage_pct is not None:
+                remaining = max(0.0, 1.0 - usage_pct / 100.0)
+                # Nunca ter mais tokens do que a API diz que sobram
+                state['tokens'] = min(state['tokens'], self.capacity * remaining)
+                state['usage_factor'] = self._usage_factor(usage_pct)
+
+            if regain_minutes:
+                state['blocked_until'] = max(state['blocked_until'], now + regain_minutes * 60)
+                state['tokens'] = 0.0
+            elif usage_pct is not None and usage_pct >= 100:
+                # Sem estimativa: esperar um token inteiro na taxa mínima
+                state['blocked_until'] = max(
+                    state['blocked_until'],
+                    now + 1.0 / (self.refill_rate * self.MIN_USAGE_FACTOR)
+                )
+
+            self._store.save(self.bucket, state)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Consumir tokens se possível; senão retornar segundos de espera"""
+        now = time.time()
+
+        with self._lock, self._store.transaction():
+            state = self._refill(self._load(), now)
+
+            if state['blocked_until'] > now:
+                self._store.save(self.bucket, state)
+                return state['blocked_until'] - now
+
+            if state['tokens'] >= tokens:
+                state['tokens'] -= tokens
+                self._store.save(self.bucket, state)
+                return 0.0
+
+            self._store.save(self.bucket, state)
+            rate = self.refill_rate * state['usage_factor']
+            return (tokens - state['tokens']) / rate
+
+    def _load(self) -> Dict[str, float]:
+        state = self._store.load(self.bucket)
+        if state is None:
+            state = {
+                'tokens': self.capacity,
+                'updated_at': time.time(),
+                'usage_factor': 1.0,
+                'blocked_until': 0.0
+            }
+        return state
+
+    def _refill(self, state: Dict[str, float], now: float) -> Dict[str, float]:
+        elapsed = max(0.0, now - state['updated_at'])
+        rate = self.refill_rate * state['usage_factor']
+        state['tokens'] = min(self.capacity, state['tokens'] + elapsed * rate)
+        state['updated_at'] = now
+
+        # Recuperar a taxa nominal gradualmente se a API parar de reportar uso alto
+        if state['usage_factor'] < 1.0 and state['blocked_until'] < now:
+            state['usage_factor'] = min(1.0, state['usage_factor'] + elapsed / 3600.0)
+
+        return state
+
+    def _usage_factor(self, usage_pct: float) -> float:
+        if usage_pct <= self.USAGE_THROTTLE_START:
+            return 1.0
+        span = 100.0 - self.USAGE_THROTTLE_START
+        factor = 1.0 - (usage_pct - self.USAGE_THROTTLE_START) / span
+        return max(self.MIN_USAGE_FACTOR, factor)
+
+
+def parse_usage_headers(headers: Mapping[str, str]):
+    """
+    Extrair (maior % de uso, minutos até recuperar acesso) dos headers da Meta
+    """
+    usage_values = []
+    regain_minutes = 0
+
+    app_usage = _load_header_json(headers, 'x-app-usage')
+    if isinstance(app_usage, dict):
+        usage_values.extend(_usage_percentages(app_usage))
+
+    buc_usage = _load_header_json(headers, 'x-business-use-case-usage')
+    if isinstance(buc_usage, dict):
+        for entries in buc_usage.values():
+            for entry in entries if isinstance(entries, list) else [entries]:
+                if not isinstance(entry, dict):
+                    continue
+                usage_values.extend(_usage_percentages(entry))
+                regain_minutes = max(
+                    regain_minutes,
+                    entry.get('estimated_time_to_regain_access') or 0
+                )
+
+    usage_pct = max(usage_values) if usage_values else None
+    return usage_pct, regain_minutes
+
+
+def _load_header_json(headers: Mapping[str, str], name: str):
+    value = headers.get(name) if headers else None
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _usage_percentages(entry: Dict) -> list:
+    values = []
+    for key in ('call_count', 'total_cputime', 'total_time'):
+        try:
+            values.append(float(entry[key]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return values
+
+
+class _MemoryStateStore:
+    """Estado do token bucket no próprio processo"""
+
+    def __init__(self):
+        self._states = {}
+
+    @contextmanager
+    def transaction(self):
+        yield
+
+    def load(self, bucket: str) -> Optional[Dict[str, float]]:
+        state = self._states.get(bucket)
+        return dict(state) if state else None
+
+    def save(self, bucket: str, state: Dict[str, float]):
+        self._states[bucket] = dict(state)
+
+
+class _SQLiteStateStore:
+    """
+    Estado do token bucket compartilhado entre processos via SQLite
+
+    Cada leitura-modificação-escrita roda dentro de BEGIN IMMEDIATE, que
+    serializa os processos pelo lock de escrita do próprio SQLite.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limiter ('
+            ' bucket TEXT PRIMARY KEY,'
+            ' tokens REAL NOT NULL,'
+            ' updated_at REAL NOT NULL,'
+            ' usage_factor REAL NOT NULL,'
+            ' blocked_until REAL NOT NULL)'
+        )
+
+    @contextmanager
+    def transaction(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def load(self, bucket: str) -> Optional[Dict[str, float]]:
+        row = self._conn.execute(
+            'SELECT tokens, updated_at, usage_factor, blocked_until'
+            ' FROM rate_limiter WHERE bucket = ?',
+            (bucket,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'tokens': row[0],
+            'updated_at': row[1],
+            'usage_factor': row[2],
+            'blocked_until': row[3]
+        }
+
+    def save(self, bucket: str, state: Dict[str, float]):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO rate_limiter'
+            ' (bucket, tokens, updated_at, usage_factor, blocked_until)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (bucket, state['tokens'], state['updated_at'],
+             state['usage_factor'], state['blocked_until'])
+        )
@@ -0,0 +1,178 @@
+# src/collectors/response_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+
+class CacheMissError(requests.exceptions.RequestException):
+    """Resposta não gravada (modo replay não acessa a rede)"""
+
+
+class ResponseCache:
+    """
+    Cache em disco das respostas da Ad Library
+
+    A chave é o hash da URL normalizada + params (sem access_token), então a
+    mesma consulta feita por jobs diferentes reaproveita a resposta.
+
+    Modos:
+        'readwrite': serve do cache dentro do TTL e grava respostas novas
+        'record': sempre vai à rede e grava tudo (sem expirar), para replay
+        'replay': serve só respostas gravadas (sem rede, ignora TTL)
+        'off': desativado
+
+    Respostas gravadas no modo 'record' ficam fixadas (pinned): nunca saem
+    por TTL nem pelo limite de tamanho, e o 'readwrite' as serve mesmo
+    depois do TTL em vez de sobrescrevê-las.
+    """
+
+    MODES = ('readwrite', 'record', 'replay', 'off')
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: int = 6 * 3600,
+        max_bytes: int = 200 * 1024 * 1024,
+        mode: str = 'readwrite'
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Modo de cache inválido: {mode} (use {', '.join(self.MODES)})")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' url TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' pinned INTEGER NOT NULL DEFAULT 0);'
+            'CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);'
+        )
+        self._migrate()
+
+    def _migrate(self):
+        """Caches criados antes da coluna pinned"""
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(responses)')}
+        if 'pinned' not in columns:
+            with self._conn:
+                self._conn.execute('ALTER TABLE responses ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0')
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == 'replay'
+
+    @staticmethod
+    def normalize(url: str, params: Optional[Dict] = None) -> str:
+        """URL canônica: params da query + params extras, ordenados, sem token"""
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        query.update({k: str(v) for k, v in (params or {}).items()})
+        query.pop('access_token', None)
+
+        # urlencode escapa '&' e '=' dos valores: consultas diferentes não
+        # colidem na mesma chave
+        canonical_query = urlencode(sorted(query.items()))
+        return urlunsplit(parts._replace(query=canonical_query, fragment=''))
+
+    @classmethod
+    def key(cls, url: str, params: Optional[Dict] = None) -> str:
+        return hashlib.sha256(cls.normalize(url, params).encode('utf-8')).hexdigest()
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Resposta gravada ou None (expirada conta como ausente, exceto no replay e se fixada)"""
+        if self.mode in ('off', 'record'):
+            return None
+
+        key = self.key(url, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, created_at, pinned FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            body, created_at, pinned = row
+            if not (self.replay_only or pinned) and now - created_at > self.ttl_seconds:
+                return None
+
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key)
+                )
+
+        return json.loads(zlib.decompress(body))
+
+    def put(self, url: str, params: Optional[Dict], data: Dict):
+        """Gravar resposta e aplicar o limite de tamanho (LRU)"""
+        if self.mode not in ('readwrite', 'record'):
+            return
+
+        body = zlib.compress(json.dumps(data).encode('utf-8'))
+        now = time.time()
+
+        pinned = int(self.mode == 'record')
+
+        with self._lock, self._conn:
+            # Gravação fixada só é substituída por outra gravação
+            self._conn.execute(
+                'INSERT INTO responses (key, url, body, size, created_at, accessed_at, pinned)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT(key) DO UPDATE SET url = excluded.url, body = excluded.body,'
+                ' size = excluded.size, created_at = excluded.created_at,'
+                ' accessed_at = excluded.accessed_at, pinned = excluded.pinned'
+                ' WHERE responses.pinned = 0 OR excluded.pinned = 1',
+                (self.key(url, params), self.normalize(url, params), body, len(body), now, now, pinned)
+            )
+            self._evict()
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM responses')
+
+    def _evict(self):
+        # Expiradas saem primeiro; depois as menos acessadas até caber no
+        # limite. Gravações fixadas ('record') não entram em nenhum dos dois
+        if self.mode == 'readwrite':
+            self._conn.execute(
+                'DELETE FROM responses WHERE pinned = 0 AND created_at < ?', (time.time() - self.ttl_seconds,)
+            )
+
+        total = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses WHERE pinned = 0'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute(
+            'SELECT key, size FROM responses WHERE pinned = 0 ORDER BY accessed_at'
+        ):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', stale_keys)
@@ -0,0 +1,147 @@
+# src/collectors/token_pool.py
+import hashlib
+import threading
+import time
+from typing import List, Optional
+
+import requests
+
+from src.collectors.rate_limiter import RateLimiter
+
+
+class NoUsableTokenError(requests.exceptions.RequestException):
+    """Todos os tokens do pool expiraram ou foram bloqueados"""
+
+
+class PooledToken:
+    """Um access token com seu próprio rate limiter e estado de saúde"""
+
+    def __init__(self, token: str, max_requests_per_hour: int, state_path: Optional[str] = None):
+        self.token = token
+        # Estado persistido pelo fingerprint, nunca pelo token em si
+        self.fingerprint = hashlib.sha256(token.encode('utf-8')).hexdigest()[:12]
+        self.limiter = RateLimiter(
+            max_requests_per_hour,
+            state_path=state_path,
+            bucket=f'token:{self.fingerprint}'
+        )
+        self.expired = False
+        self.blocked_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+
+    def usable(self, now: float) -> bool:
+        return not self.expired and self.blocked_until <= now
+
+    def __repr__(self):
+        status = 'expired' if self.expired else (
+            'blocked' if self.blocked_until > time.time() else 'ok'
+        )
+        return f"<PooledToken {self.fingerprint} {status} requests={self.requests}>"
+
+
+class TokenPool:
+    """
+    Pool de access tokens (um por app aprovado)
+
+    Cada request vai para o token com mais orçamento restante. Tokens
+    expirados/inválidos saem da rotação; tokens em rate limit ficam de fora
+    até o tempo de recuperação.
+    """
+
+    # Códigos de erro da Graph API
+    EXPIRED_CODES = {102, 190}           # token inválido/expirado
+    PERMISSION_CODES = {10, 200, 2500}   # app sem acesso à Ad Library
+    THROTTLE_CODES = {4, 17, 32, 613}    # rate limit do app/usuário/página
+
+    BLOCK_SECONDS = 300  # pausa de um token em rate limit sem estimativa
+    MAX_CONSECUTIVE_FAILURES = 5
+
+    def __init__(
+        self,
+        tokens: List[str],
+        max_requests_per_hour: int,
+        state_path: Optional[str] = None
+    ):
+        # Pool vazio é permitido (ex.: modo replay do cache); acquire() falha
+        unique_tokens = [t for t in dict.fromkeys(tokens) if t]
+        self.tokens = [PooledToken(t, max_requests_per_hour, state_path) for t in unique_tokens]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def acquire(self, cost: int = 1) -> PooledToken:
+        """
+        Escolher o token com mais orçamento e consumir `cost` requests dele
+
+        Uma chamada batch da Graph API custa uma request por sub-request.
+
+        Bloqueia até o token escolhido ter orçamento; levanta
+        NoUsableTokenError se nenhum token puder ser usado.
+        """
+        while True:
+            now = time.time()
+
+            with self._lock:
+                candidates = [t for t in self.tokens if t.usable(now)]
+
+                if not candidates:
+                    pending = [t.blocked_until for t in self.tokens if not t.expired]
+                    if not pending:
+                        raise NoUsableTokenError(
+                            "Nenhum access token válido no pool (configure FB_ACCESS_TOKEN)"
+                        )
+                    wait_time = min(pending) - now
+                else:
+                    best = max(candidates, key=lambda t: t.limiter.available())
+                    wait_time = 0
+
+            if wait_time > 0:
+                print(f"Todos os tokens bloqueados. Aguardando {wait_time:.0f}s...")
+                time.sleep(wait_time)
+                continue
+
+            best.limiter.wait_if_needed(cost)
+            best.requests += cost
+            return best
+
+    def report_success(self, token: PooledToken):
+        token.consecutive_failures = 0
+
+    def report_failure(self, token: PooledToken):
+        """Erro transitório (timeout, 5xx) atribuído ao token"""
+        token.consecutive_failures += 1
+        if token.consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES:
+            token.blocked_until = time.time() + self.BLOCK_SECONDS
+            token.consecutive_failures = 0
+
+    def report_error(self, token: PooledToken, error_code: Optional[int], retry_after: float = None) -> bool:
+        """
+        Tratar erro da Graph API; retorna True se vale tentar com outro token
+        """
+        if error_code in self.EXPIRED_CODES or error_code in self.PERMISSION_CODES:
+            token.expired = True
+            print(f"Token {token.fingerprint} removido da rotação (erro {error_code})")
+            return True
+
+        if error_code in self.THROTTLE_CODES:
+            token.blocked_until = time.time() + (retry_after or self.BLOCK_SECONDS)
+            print(f"Token {token.fingerprint} em rate limit (erro {error_code})")
+            return True
+
+        return False
+
+    def status(self) -> List[dict]:
+        """Resumo do pool (para logs/monitoramento)"""
+        now = time.time()
+        return [
+            {
+                'token': t.fingerprint,
+                'expired': t.expired,
+                'blocked_for_s': max(0.0, t.blocked_until - now),
+                'available': t.limiter.available(),
+                'requests': t.requests
+            }
+            for t in self.tokens
+        ]
@@ -7,16 +7,58 @@ load_dotenv()
 class Config:
     # Meta API
     FB_ACCESS_TOKEN = os.getenv('FB_ACCESS_TOKEN')
+    # Vários apps aprovados: tokens separados por vírgula (cada um com sua quota)
+    FB_ACCESS_TOKENS = [t.strip() for t in os.getenv('FB_ACCESS_TOKENS', '').split(',') if t.strip()]
     FB_API_VERSION = 'v20.0'  # Updated to latest stable version
     FB_BASE_URL = f'https://graph.facebook.com/{FB_API_VERSION}'
 
     # Rate Limiting
     API_RATE_LIMIT = 200  # requests per hour
     API_RETRY_ATTEMPTS = 3
-    API_RETRY_DELAY = 5  # seconds
+    API_RETRY_DELAY = 5  # seconds (base do backoff exponencial)
+    API_RETRY_MAX_DELAY = 60  # seconds
+    API_TIMEOUT = 30  # seconds
+    API_POOL_SIZE = 10  # conexões keep-alive por host
+    # Estado do rate limiter compartilhado entre processos (vazio = só em memória)
+    RATE_LIMIT_STATE_PATH = os.getenv('RATE_LIMIT_STATE_PATH', 'data/rate_limiter.db')
+    API_MAX_CONCURRENCY = 4  # cadeias de paginação simultâneas (coletor assíncrono)
+
+    # Checkpoints de paginação (vazio = desativado)
+    CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', 'data/checkpoints.db')
+    CHECKPOINT_TTL = 24 * 3600  # seconds; cursores mais velhos são descartados
+
+    # Cache de respostas da API (vazio = desativado)
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', 'data/response_cache.db')
+    RESPONSE_CACHE_MODE = os.getenv('RESPONSE_CACHE_MODE', 'readwrite')  # readwrite, record, replay, off
+    RESPONSE_CACHE_TTL = 6 * 3600  # seconds
+    RESPONSE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+    # Competitors com page_id conhecido (coletados por requests batch)
+    # Formato: "OpusClip:123456789,Descript:987654321"
+    COMPETITOR_PAGE_IDS = dict(
+        item.strip().rsplit(':', 1) for item in os.getenv('COMPETITOR_PAGE_IDS', '').split(',')
+        if ':' in item
+    )
+
+    # Parsing em paralelo (AdParser.parse_batch com workers > 1)
+    PARSE_CHUNK_SIZE = 20_000  # ads por tarefa do pool (limita a memória por worker)
+
+    # Dicionários extras de CTA: JSON {"idioma": ["frase", ...]} (opcional)
+    CTA_DICTIONARY_PATH = os.getenv('CTA_DICTIONARY_PATH')
 
     # Database
     DB_PATH = 'data/ads_intelligence.db'
+    DB_BUSY_TIMEOUT = 30  # seconds esperando o lock de escrita
+    DB_POOL_SIZE = 5  # conexões por processo (engine compartilhada)
+    DB_CACHE_SIZE_MB = 64  # cache de páginas por conexão
+
+    # Arquivo Parquet para análises (particionado por data de coleta e keyword)
+    PARQUET_ARCHIVE_PATH = os.getenv('PARQUET_ARCHIVE_PATH', 'data/archive')
+    PARQUET_COMPRESSION = 'zstd'
+
+    # Engine das agregações de relatório/tendências: 'pandas' ou 'duckdb'
+    # (SQL no DuckDB sobre o SQLite/arquivo Parquet; requer pip install duckdb)
+    ANALYTICS_ENGINE = os.getenv('ANALYTICS_ENGINE', 'pandas')
 
     # Scraping
     HEADLESS = True
@@ -1,11 +1,15 @@
 # src/main.py
-from src.collectors.meta_api_collector import MetaAdLibraryAPI
-from src.processors.ad_parser import AdParser
+from src.collectors.meta_api_collector import MetaAdLibraryAPI, resolve_fields
+from src.collectors.async_collector import AsyncMetaAdLibraryAPI
+from src.processors.ad_parser import AdParser, utc_now
 from src.storage.database import AdDatabase
-from src.analyzers.ad_analyzer import AdAnalyzer
+from src.analyzers.ad_analyzer import AdAnalyzer, ChunkedAdAnalyzer
 from src.config import Config
+import asyncio
+from contextlib import contextmanager
+from typing import Iterator
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 
 logging.basicConfig(level=logging.INFO)
@@ -17,10 +21,15 @@ class AdIntelligencePipeline:
     Pipeline completo de coleta e análise
     """
 
-    def __init__(self):
-        self.api = MetaAdLibraryAPI()
-        self.parser = AdParser()
-        self.db = AdDatabase()
+    def __init__(
+        self,
+        api: MetaAdLibraryAPI = None,
+        parser: AdParser = None,
+        db: AdDatabase = None
+    ):
+        self.api = api or MetaAdLibraryAPI()
+        self.parser = parser or AdParser()
+        self.db = db or AdDatabase()
         logger.info("Pipeline inicializado")
 
     def collect_and_analyze(
@@ -28,68 +37,270 @@ class AdIntelligencePipeline:
         keywords: list,
         countries: list = ['US'],
         platforms: list = ['instagram'],
-        limit_per_keyword: int = 100
+        limit_per_keyword: int = 100,
+        max_concurrency: int = 1,
+        incremental: bool = False,
+        field_profile: str = 'full',
+        as_of: datetime = None
     ):
         """
         Executar pipeline completo para lista de keywords
+
+        Com max_concurrency > 1 as keywords são coletadas em paralelo
+        (AsyncMetaAdLibraryAPI) e processadas à medida que chegam.
+
+        Com incremental=True, cada keyword só pede ads entregues a partir da
+        sua watermark (última data de início coletada) e a paginação para
+        na primeira página em que todos os ads já estavam no database antes
+        da execução.
+
+        field_profile escolhe os campos pedidos à API (ver FIELD_PROFILES);
+        colunas sem dados no perfil ficam vazias.
+
+        as_of é o timestamp da execução (padrão: agora), usado em
+        days_active de todos os ads da execução.
         """
 
+        fields = resolve_fields(field_profile=field_profile)
+        as_of = as_of or utc_now()
+
+        if max_concurrency > 1:
+            return asyncio.run(self._collect_and_analyze_async(
+                keywords, countries, platforms, limit_per_keyword, max_concurrency,
+                incremental, fields, as_of
+            ))
+
         all_results = {}
+        seen = {}  # ad_id -> DataFrame em que foi processado nesta execução
 
         for keyword in keywords:
             logger.info(f"Processando keyword: {keyword}")
 
             try:
-                # 1. Coletar
+                # 1. Coletar (página a página, processando enquanto baixa)
                 logger.info(f"  Coletando ads...")
-                raw_ads = self.api.search_ads(
+                pages = self.api.search_ads_iter(
                     search_terms=keyword,
                     countries=countries,
                     platforms=platforms,
-                    limit=limit_per_keyword
+                    limit=limit_per_keyword,
+                    fields=fields,
+                    **(self._incremental_kwargs(keyword, seen) if incremental else {})
                 )
 
-                if not raw_ads:
-                    logger.warning(f"  Nenhum ad encontrado para '{keyword}'")
-                    continue
-
-                logger.info(f"  {len(raw_ads)} ads coletados")
-
-                # 2. Processar
-                logger.info(f"  Processando ads...")
-                parsed_df = self.parser.parse_batch(raw_ads)
+                result = self._process_keyword(
+                    keyword, (page.ads for page in pages),
+                    update_watermark=incremental, fields=fields, seen=seen, as_of=as_of
+                )
+                if result:
+                    all_results[keyword] = result
 
-                # 3. Salvar
-                logger.info(f"  Salvando no database...")
-                self.db.save_ads(parsed_df, search_keyword=keyword)
+            except Exception as e:
+                logger.error(f"  ✗ Erro ao processar '{keyword}': {e}")
+                continue
 
-                # 4. Analisar
-                logger.info(f"  Analisando padrões...")
-                analyzer = AdAnalyzer(parsed_df)
-                insights = analyzer.get_insights_summary()
+        return all_results
 
-                all_results[keyword] = {
-                    'total_ads': len(parsed_df),
-                    'insights': insights,
-                    'top_performers': analyzer.get_top_performers(min_days=30)
-                }
+    async def _collect_and_analyze_async(
+        self,
+        keywords: list,
+        countries: list,
+        platforms: list,
+        limit_per_keyword: int,
+        max_concurrency: int,
+        incremental: bool = False,
+        fields: list = None,
+        as_of: datetime = None
+    ):
+        """Coleta concorrente das keywords, processando cada uma ao terminar"""
 
-                logger.info(f"  ✓ Keyword '{keyword}' processada com sucesso")
+        all_results = {}
+        seen = {}  # ad_id -> DataFrame em que foi processado nesta execução
+        collector = AsyncMetaAdLibraryAPI(self.api, max_concurrency=max_concurrency)
+
+        logger.info(f"Coletando {len(keywords)} keywords em paralelo (max {max_concurrency})...")
+
+        async for keyword, _, raw_ads in collector.search_many(
+            keywords,
+            countries=countries,
+            platforms=platforms,
+            limit=limit_per_keyword,
+            fields=fields,
+            split_countries=False,
+            keyword_kwargs=(
+                {keyword: self._incremental_kwargs(keyword, seen) for keyword in keywords}
+                if incremental else None
+            )
+        ):
+            try:
+                result = self._process_keyword(
+                    keyword, [raw_ads], update_watermark=incremental, fields=fields, seen=seen,
+                    as_of=as_of
+                )
+                if result:
+                    all_results[keyword] = result
 
             except Exception as e:
                 logger.error(f"  ✗ Erro ao processar '{keyword}': {e}")
-                continue
 
         return all_results
 
-    def analyze_competitors(self, competitor_pages: list):
+    def _incremental_kwargs(self, keyword: str, seen: dict) -> dict:
+        """
+        Parâmetros de search_ads para coletar só o que é novo na keyword
+
+        A parada conta só ads conhecidos antes da execução: os que outra
+        keyword salvou agora (em `seen`) ficam fora da checagem.
+        """
+
+        def known_before_run(ad_ids):
+            return self.db.all_ad_ids_known([ad_id for ad_id in ad_ids if ad_id not in seen])
+
+        kwargs = {'stop_when_known': known_before_run}
+
+        watermark = self.db.get_watermark(keyword)
+        if watermark:
+            # 1 dia de sobreposição: a API filtra por data, não por horário
+            since = watermark - timedelta(days=1)
+            kwargs['delivery_date_min'] = since.strftime('%Y-%m-%d')
+            logger.info(f"  Coleta incremental desde {kwargs['delivery_date_min']}")
+
+        return kwargs
+
+    def _process_keyword(
+        self,
+        keyword: str,
+        pages,
+        update_watermark: bool = False,
+        fields: list = None,
+        seen: dict = None,
+        as_of: datetime = None
+    ):
+        """
+        Processar, salvar e analisar os ads coletados de uma keyword
+
+        `pages` é um iterável de listas de ads brutos; cada página é
+        processada e salva assim que chega.
+
+        `seen` é compartilhado entre as keywords da execução: um ad que já
+        apareceu em outra keyword não é processado nem salvo de novo, só
+        registrado como match desta keyword e reaproveitado na análise.
+        """
+
+        if seen is None:
+            seen = {}
+
+        parsed_pages = []
+        reused = {}  # id(DataFrame) -> (DataFrame, ad_ids)
+        keyword_ids = set()
+        total_raw = 0
+
+        for raw_ads in pages:
+            if not raw_ads:
+                continue
+
+            total_raw += len(raw_ads)
+
+            new_ads = []
+            repeated_ids = []
+            for ad in raw_ads:
+                ad_id = ad.get('id')
+                if ad_id in keyword_ids:
+                    continue
+                keyword_ids.add(ad_id)
+
+                if ad_id in seen:
+                    repeated_ids.append(ad_id)
+                else:
+                    new_ads.append(ad)
+
+            if repeated_ids:
+                self.db.add_keyword_matches(repeated_ids, keyword)
+                for ad_id in repeated_ids:
+                    frame = seen[ad_id]
+                    reused.setdefault(id(frame), (frame, set()))[1].add(ad_id)
+
+            if not new_ads:
+                continue
+
+            # 2. Processar
+            parsed_df = self.parser.parse_batch(new_ads, fields=fields, as_of=as_of)
+
+            # 3. Salvar
+            saved = self.db.save_ads(parsed_df, search_keyword=keyword)
+            logger.info(
+                f"  {saved['inserted']} novos, {saved['updated']} atualizados, "
+                f"{saved['unchanged']} sem mudança"
+            )
+            parsed_pages.append(parsed_df)
+
+            for ad_id in parsed_df['ad_id']:
+                seen[ad_id] = parsed_df
+
+        # Ads já processados em outra keyword entram na análise sem reprocessar
+        for frame, ad_ids in reused.values():
+            parsed_pages.append(frame[frame['ad_id'].isin(ad_ids)])
+
+        if not parsed_pages:
+            logger.warning(f"  Nenhum ad encontrado para '{keyword}'")
+            return None
+
+        logger.info(f"  {total_raw} ads coletados e salvos para '{keyword}'")
+
+        parsed_df = pd.concat(parsed_pages, ignore_index=True)
+
+        if update_watermark:
+            self.db.update_watermark(keyword, parsed_df['start_date'].max())
+
+        # 4. Analisar
+        logger.info(f"  Analisando padrões...")
+        analyzer = AdAnalyzer(parsed_df)
+        insights = analyzer.get_insights_summary()
+
+        logger.info(f"  ✓ Keyword '{keyword}' processada com sucesso")
+
+        return {
+            'total_ads': len(parsed_df),
+            'insights': insights,
+            'top_performers': analyzer.get_top_performers(min_days=30)
+        }
+
+    def analyze_competitors(self, competitor_pages: list, page_ids: dict = None, as_of: datetime = None):
         """
         Análise focada em competitors específicos
+
+        Args:
+            competitor_pages: Nomes das páginas
+            page_ids: Opcional, nome -> page_id; essas páginas são coletadas
+                juntas por requests batch, as demais por busca de nome
+            as_of: Timestamp da execução para days_active (padrão: agora)
         """
 
         all_ads = []
+        as_of = as_of or utc_now()
+        page_ids = {page: page_ids[page] for page in competitor_pages if page in (page_ids or {})}
+
+        if page_ids:
+            logger.info(f"Coletando ads de {len(page_ids)} páginas em batch...")
+
+            try:
+                ads_by_page = self.api.get_ads_by_pages(list(page_ids.values()), limit=100)
+            except Exception as e:
+                logger.error(f"  Erro na coleta em batch: {e}")
+                ads_by_page = {}
+
+            for page, page_id in page_ids.items():
+                ads = ads_by_page.get(page_id, [])
+                if ads:
+                    parsed = self.parser.parse_batch(ads, as_of=as_of)
+                    self.db.save_ads(parsed, search_keyword=f"competitor:{page}")
+                    all_ads.append(parsed)
+                    logger.info(f"  {len(ads)} ads de {page} coletados")
 
         for page in competitor_pages:
+            if page in page_ids:
+                continue
+
             logger.info(f"Coletando ads de {page}...")
 
             try:
@@ -103,7 +314,7 @@ class AdIntelligencePipeline:
                 ads = [ad for ad in ads if ad.get('page_name') == page]
 
                 if ads:
-                    parsed = self.parser.parse_batch(ads)
+                    parsed = self.parser.parse_batch(ads, as_of=as_of)
                     self.db.save_ads(parsed, search_keyword=f"competitor:{page}")
                     all_ads.append(parsed)
                     logger.info(f"  {len(ads)} ads de {page} coletados")
@@ -122,6 +333,24 @@ class AdIntelligencePipeline:
 
         return None
 
+    @contextmanager
+    def _report_analyzer(self) -> Iterator[AdAnalyzer]:
+        """Analyzer do relatório conforme Config.ANALYTICS_ENGINE (conexão DuckDB fechada no fim)"""
+        if Config.ANALYTICS_ENGINE == 'duckdb':
+            from src.analyzers.duckdb_engine import DuckDBAdAnalyzer
+            try:
+                # Agregações em SQL direto sobre o database
+                analyzer = DuckDBAdAnalyzer.from_sqlite(self.db.db_path)
+            except (ImportError, RuntimeError) as e:
+                logger.warning(f"Engine DuckDB indisponível, usando pandas: {e}")
+            else:
+                with analyzer:
+                    yield analyzer
+                return
+
+        # Ads do database em chunks: só os agregados ficam em memória
+        yield ChunkedAdAnalyzer(self.db.iter_chunks(columns=ChunkedAdAnalyzer.COLUMNS))
+
     def generate_report(self, output_path: str = 'reports/intelligence_report.txt'):
         """
         Gerar relatório consolidado
@@ -129,60 +358,54 @@ class AdIntelligencePipeline:
 
         logger.info("Gerando relatório...")
 
-        # Buscar todos os ads do database
-        from src.storage.database import Ad
-        all_ads = self.db.session.query(Ad).all()
-        df = self.db._to_dataframe(all_ads)
-
-        if len(df) == 0:
-            logger.warning("Nenhum dado disponível para relatório")
-            return
-
-        analyzer = AdAnalyzer(df)
-
-        # Gerar relatório
-        report = []
-        report.append("=" * 80)
-        report.append("RELATÓRIO DE INTELIGÊNCIA DE ADS")
-        report.append(f"Gerado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append("=" * 80)
-        report.append("")
-
-        # Stats gerais
-        stats = self.db.get_stats()
-        report.append("ESTATÍSTICAS GERAIS")
-        report.append(f"Total de ads: {stats['total_ads']}")
-        report.append(f"Ads ativos: {stats['active_ads']}")
-        report.append(f"Páginas únicas: {stats['unique_pages']}")
-        report.append("")
-
-        # Insights
-        report.append(analyzer.get_insights_summary())
-        report.append("")
-
-        # Top performers
-        report.append("TOP 10 ADS POR LONGEVIDADE")
-        top = analyzer.get_top_performers(min_days=30, top_n=10)
-        for i, (_, ad) in enumerate(top.iterrows(), 1):
-            report.append(f"{i}. {ad['page_name']} - {ad['days_active']} dias")
-            report.append(f"   Headline: {ad['headline']}")
-            report.append(f"   CTA: {ad['cta_detected']}")
+        with self._report_analyzer() as analyzer:
+            if analyzer.total_ads == 0:
+                logger.warning("Nenhum dado disponível para relatório")
+                return
+
+            # Gerar relatório
+            report = []
+            report.append("=" * 80)
+            report.append("RELATÓRIO DE INTELIGÊNCIA DE ADS")
+            report.append(f"Gerado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            report.append("=" * 80)
+            report.append("")
+
+            # Stats gerais
+            stats = self.db.get_stats()
+            report.append("ESTATÍSTICAS GERAIS")
+            report.append(f"Total de ads: {stats['total_ads']}")
+            report.append(f"Ads ativos: {stats['active_ads']}")
+            report.append(f"Páginas únicas: {stats['unique_pages']}")
             report.append("")
 
-        # Análise por página
-        report.append("ANÁLISE POR PÁGINA")
-        by_page = analyzer.analyze_by_page().head(10)
-        report.append(by_page.to_string())
-        report.append("")
+            # Insights
+            report.append(analyzer.get_insights_summary())
+            report.append("")
 
-        # Padrões de sucesso
-        report.append("PADRÕES EM ADS DE SUCESSO (30+ dias)")
-        patterns = analyzer.get_successful_patterns(min_days=30)
-        for key, value in patterns.items():
-            report.append(f"{key}: {value}")
-        report.append("")
+            # Top performers
+            report.append("TOP 10 ADS POR LONGEVIDADE")
+            top = analyzer.get_top_performers(min_days=30, top_n=10)
+            for i, (_, ad) in enumerate(top.iterrows(), 1):
+                report.append(f"{i}. {ad['page_name']} - {ad['days_active']} dias")
+                report.append(f"   Headline: {ad['headline']}")
+                report.append(f"   CTA: {ad['cta_detected']}")
+                report.append("")
+
+            # Análise por página
+            report.append("ANÁLISE POR PÁGINA")
+            by_page = analyzer.analyze_by_page().head(10)
+            report.append(by_page.to_string())
+            report.append("")
+
+            # Padrões de sucesso
+            report.append("PADRÕES EM ADS DE SUCESSO (30+ dias)")
+            patterns = analyzer.get_successful_patterns(min_days=30)
+            for key, value in patterns.items():
+                report.append(f"{key}: {value}")
+            report.append("")
 
-        report.append("=" * 80)
+            report.append("=" * 80)
 
         # Salvar
         report_text = '\n'.join(report)
@@ -1,8 +1,18 @@
 # processors/ad_parser.py
-import re
-from datetime import datetime
-from typing import Dict, List, Optional
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 import pandas as pd
+import pyarrow as pa
+from src.config import Config
+from src.processors.arrow_output import AD_SCHEMA, columns_to_table
+from src.processors.cta_matcher import CTA_DICTIONARIES, CTAHit, CTAMatcher
+from src.processors.text_features import (
+    EMOJI_PATTERN, HASHTAG_PATTERN, MENTION_PATTERN, TextFeatureExtractor, creative_hash
+)
 
 
 class AdParser:
@@ -10,15 +20,65 @@ class AdParser:
     Parser para extrair insights estruturados de ads
     """
 
-    CTA_PATTERNS = [
-        'learn more', 'sign up', 'get started', 'try free',
-        'download', 'shop now', 'book now', 'subscribe',
-        'join now', 'apply now', 'contact us', 'see more'
+    # CTAs em inglês (os demais idiomas estão em cta_matcher.CTA_DICTIONARIES)
+    CTA_PATTERNS = CTA_DICTIONARIES['en']
+
+    TEXT_FIELDS = [
+        'ad_creative_bodies', 'ad_creative_link_titles',
+        'ad_creative_link_descriptions', 'ad_creative_link_captions'
     ]
 
-    def parse_ad(self, ad_data: Dict) -> Dict:
+    # Campos da API de que cada coluna depende (para registros parciais)
+    COLUMN_SOURCES = {
+        'page_name': ['page_name'],
+        'page_id': ['page_id'],
+        'start_date': ['ad_delivery_start_time'],
+        'end_date': ['ad_delivery_stop_time'],
+        'is_active': ['ad_delivery_stop_time'],
+        'days_active': ['ad_delivery_start_time', 'ad_delivery_stop_time'],
+        'platforms': ['platforms'],
+        'snapshot_url': ['ad_snapshot_url'],
+        'body': ['ad_creative_bodies'],
+        'headline': ['ad_creative_link_titles'],
+        'description': ['ad_creative_link_descriptions'],
+        'link_caption': ['ad_creative_link_captions'],
+        'full_text': TEXT_FIELDS,
+        'creative_hash': TEXT_FIELDS,
+        'text_length': TEXT_FIELDS,
+        'has_emoji': TEXT_FIELDS,
+        'has_hashtags': TEXT_FIELDS,
+        'hashtags': TEXT_FIELDS,
+        'mentions': TEXT_FIELDS,
+        'cta_detected': TEXT_FIELDS,
+    }
+
+    # Colunas numéricas: nulas (NaN) quando o perfil não traz os campos
+    NUMERIC_COLUMNS = ['days_active', 'text_length']
+
+    def __init__(self, cta_matcher: CTAMatcher = None):
+        """
+        Args:
+            cta_matcher: Dicionários de CTA a usar (padrão: dicionários
+                embutidos, mais Config.CTA_DICTIONARY_PATH se definido)
+        """
+        if cta_matcher is None:
+            cta_matcher = (
+                CTAMatcher.from_json(Config.CTA_DICTIONARY_PATH)
+                if Config.CTA_DICTIONARY_PATH else CTAMatcher()
+            )
+        self.text_features = TextFeatureExtractor(cta_matcher)
+
+    def parse_ad(self, ad_data: Dict, fields: List[str] = None, as_of: datetime = None) -> Dict:
         """
         Converte dados brutos da API em formato estruturado
+
+        `as_of` é o instante de referência para days_active de ads ainda
+        ativos (padrão: agora). Com o mesmo as_of o resultado é sempre o
+        mesmo.
+
+        Se `fields` (campos pedidos à API) for informado, colunas que
+        dependem de campos não pedidos ficam None em vez de valores
+        enganosos (ex.: is_active sem ad_delivery_stop_time).
         """
 
         parsed = {
@@ -39,6 +99,7 @@ class AdParser:
 
             # Campos derivados
             'full_text': None,
+            'creative_hash': None,
             'text_length': 0,
             'has_emoji': False,
             'has_hashtags': False,
@@ -57,23 +118,33 @@ class AdParser:
         ]))
 
         parsed['full_text'] = full_text
-        parsed['text_length'] = len(full_text)
+        parsed['creative_hash'] = creative_hash(
+            parsed['body'], parsed['headline'], parsed['description'], parsed['link_caption']
+        )
 
-        # Análise de texto
-        parsed['has_emoji'] = self._contains_emoji(full_text)
-        parsed['hashtags'] = self._extract_hashtags(full_text)
-        parsed['has_hashtags'] = len(parsed['hashtags']) > 0
-        parsed['mentions'] = self._extract_mentions(full_text)
-        parsed['cta_detected'] = self._detect_cta(full_text)
+        # Análise de texto (emoji, hashtags, mentions, CTA e tamanho)
+        parsed.update(self.text_features.extract(full_text))
 
         # Calcular dias ativo
         if parsed['start_date']:
-            end = parsed['end_date'] or datetime.now()
+            end = parsed['end_date'] or _as_of(as_of)
             delta = end - parsed['start_date']
             parsed['days_active'] = delta.days
 
+        if fields is not None:
+            for column in self._missing_columns(fields):
+                parsed[column] = None
+
         return parsed
 
+    def _missing_columns(self, fields: List[str]) -> List[str]:
+        """Colunas sem todos os campos de origem na lista pedida à API"""
+        requested = set(fields)
+        return [
+            column for column, sources in self.COLUMN_SOURCES.items()
+            if not requested.issuperset(sources)
+        ]
+
     def _extract_text(self, ad_data: Dict, field: str) -> Optional[str]:
         """Extrair primeiro item de array de texto"""
         value = ad_data.get(field, [])
@@ -82,46 +153,266 @@ class AdParser:
         return None
 
     def _parse_date(self, date_str: Optional[str]) -> Optional[datetime]:
-        """Converter string ISO para datetime"""
+        """
+        Converter string ISO para datetime
+
+        Datas com fuso viram UTC sem fuso, para ficarem comparáveis com as
+        datas simples da API e com o as_of.
+        """
         if not date_str:
             return None
         try:
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        except:
+            parsed = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        except (AttributeError, TypeError, ValueError):
             return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
 
     def _contains_emoji(self, text: str) -> bool:
         """Detectar presença de emojis"""
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map
-            "\U0001F1E0-\U0001F1FF"  # flags
-            "]+",
-            flags=re.UNICODE
-        )
-        return bool(emoji_pattern.search(text))
+        return bool(EMOJI_PATTERN.search(text))
 
     def _extract_hashtags(self, text: str) -> List[str]:
         """Extrair hashtags"""
-        return re.findall(r'#\w+', text)
+        return HASHTAG_PATTERN.findall(text)
 
     def _extract_mentions(self, text: str) -> List[str]:
         """Extrair mentions (@username)"""
-        return re.findall(r'@\w+', text)
+        return MENTION_PATTERN.findall(text)
 
     def _detect_cta(self, text: str) -> Optional[str]:
         """Detectar CTA no texto"""
-        text_lower = text.lower()
-        for cta in self.CTA_PATTERNS:
-            if cta in text_lower:
-                return cta
-        return None
+        return self.text_features.detect_cta(text)
+
+    def find_ctas(self, text: str) -> List[CTAHit]:
+        """Todos os CTAs do texto (frase, idioma, início, fim)"""
+        return self.text_features.find_ctas(text)
 
-    def parse_batch(self, ads: List[Dict]) -> pd.DataFrame:
+    def parse_batch(
+        self,
+        ads: Iterable[Dict],
+        fields: List[str] = None,
+        workers: Optional[int] = 1,
+        chunk_size: int = None,
+        as_of: datetime = None
+    ) -> pd.DataFrame:
         """
         Processar múltiplos ads e retornar DataFrame
+
+        Com workers != 1 (None = um por CPU), os ads são divididos em
+        chunks de `chunk_size` e parseados num pool de processos; os
+        resultados voltam na ordem original. Só `workers * 2` chunks ficam
+        em trânsito por vez, então `ads` pode ser um gerador (ex.: leitura
+        de um arquivo de respostas brutas) sem carregar tudo na memória.
+
+        `as_of` (padrão: agora, fixado uma vez para o lote inteiro) é a
+        referência de days_active; passe o timestamp da execução para
+        resultados reprodutíveis.
+
+        Caminho colunar: o JSON vira colunas uma vez; datas e features de
+        texto são calculadas só para os valores distintos (ads repetem
+        muito criativos e datas) e expandidas por índice; days_active sai
+        de uma subtração de colunas datetime contra o as_of. O resultado é
+        igual ao de parse_ad ad a ad, que continua sendo usado se alguma
+        data não couber numa coluna datetime64.
+        """
+        workers = workers or os.cpu_count() or 1
+        chunk_size = chunk_size or Config.PARSE_CHUNK_SIZE
+        as_of = _as_of(as_of)
+
+        if workers > 1 or not isinstance(ads, list):
+            return self._parse_chunks(_chunked(ads, chunk_size), fields, workers, as_of)
+
+        if not ads:
+            return pd.DataFrame()
+
+        columns = self._parse_columns(ads, as_of)
+        if columns is None:
+            return self._numeric(pd.DataFrame([self.parse_ad(ad, fields, as_of) for ad in ads]))
+
+        if fields is not None:
+            for column in self._missing_columns(fields):
+                columns[column] = [None] * len(ads)
+
+        return self._numeric(pd.DataFrame(columns))
+
+    def _numeric(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Colunas numéricas sem dados (perfil parcial) como float com NaN, não object"""
+        for column in self.NUMERIC_COLUMNS:
+            if column in df.columns and df[column].dtype == object:
+                df[column] = pd.to_numeric(df[column], errors='coerce')
+        return df
+
+    def parse_table(self, ads: List[Dict], fields: List[str] = None, as_of: datetime = None) -> pa.Table:
+        """
+        Processar múltiplos ads e retornar uma tabela Arrow (ver AD_SCHEMA)
+
+        Mesmas colunas de parse_batch, montadas direto das colunas do
+        parser: hashtags/mentions como list<string> e page_name
+        dictionary-encoded. AdDatabase.save_ads e AdAnalyzer aceitam a
+        tabela diretamente.
         """
-        parsed_ads = [self.parse_ad(ad) for ad in ads]
-        return pd.DataFrame(parsed_ads)
+        if not ads:
+            return AD_SCHEMA.empty_table()
+
+        as_of = _as_of(as_of)
+        columns = self._parse_columns(ads, as_of)
+        if columns is None:
+            rows = [self.parse_ad(ad, as_of=as_of) for ad in ads]
+            columns = {name: [row[name] for row in rows] for name in AD_SCHEMA.names}
+
+        if fields is not None:
+            for column in self._missing_columns(fields):
+                columns[column] = [None] * len(ads)
+
+        return columns_to_table(columns)
+
+    def _parse_chunks(
+        self,
+        chunks: Iterator[List[Dict]],
+        fields: Optional[List[str]],
+        workers: int,
+        as_of: datetime
+    ) -> pd.DataFrame:
+        """Parsear chunks (em paralelo se workers > 1) e juntar em ordem"""
+        frames = []
+
+        if workers == 1:
+            frames = [self.parse_batch(chunk, fields, as_of=as_of) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self,)
+            ) as executor:
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(executor.submit(_parse_chunk, chunk, fields, as_of))
+                    if len(in_flight) >= workers * 2:
+                        frames.append(in_flight.popleft().result())
+                while in_flight:
+                    frames.append(in_flight.popleft().result())
+
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+
+        # Um chunk sem nenhuma data (coluna object de None) e outro com
+        # datas viram object no concat; reinferir dá o dtype do lote único
+        merged = pd.concat(frames, ignore_index=True)
+        mixed = [
+            column for column in merged.columns
+            if len({str(frame[column].dtype) for frame in frames}) > 1
+        ]
+        if mixed:
+            merged[mixed] = merged[mixed].infer_objects()
+        return merged
+
+    def _parse_columns(self, ads: List[Dict], as_of: datetime) -> Optional[Dict]:
+        """Colunas de parse_batch, na ordem de parse_ad (None = usar parse_ad)"""
+        start_date = self._map_unique([ad.get('ad_delivery_start_time') for ad in ads], self._parse_date)
+        stop_times = [ad.get('ad_delivery_stop_time') for ad in ads]
+        end_date = self._map_unique(stop_times, self._parse_date)
+
+        # Datas fora do intervalo do datetime64 ficam object: caminho por ad
+        if not all(pd.api.types.is_datetime64_dtype(column) or column.isna().all()
+                   for column in (start_date, end_date)):
+            return None
+
+        body = _first_items(ads, 'ad_creative_bodies')
+        headline = _first_items(ads, 'ad_creative_link_titles')
+        description = _first_items(ads, 'ad_creative_link_descriptions')
+        link_caption = _first_items(ads, 'ad_creative_link_captions')
+
+        full_text = [
+            ' '.join(filter(None, parts))
+            for parts in zip(body, headline, description, link_caption)
+        ]
+        codes, texts = pd.factorize(pd.Series(full_text, dtype=object), sort=False)
+        features = pd.DataFrame(
+            [self.text_features.extract(text) for text in texts]
+        ).take(codes).reset_index(drop=True)
+
+        if start_date.isna().all():
+            days_active = [None] * len(ads)
+        else:
+            as_of = pd.Timestamp(as_of)
+            end = end_date.fillna(as_of) if not end_date.isna().all() else as_of
+            days_active = (end - start_date).dt.days
+
+        return {
+            'ad_id': [ad.get('id') for ad in ads],
+            'page_name': [ad.get('page_name') for ad in ads],
+            'page_id': [ad.get('page_id') for ad in ads],
+            'start_date': start_date,
+            'end_date': end_date,
+            'is_active': [stop_time is None for stop_time in stop_times],
+            'platforms': [','.join(ad.get('platforms', [])) for ad in ads],
+            'snapshot_url': [ad.get('ad_snapshot_url') for ad in ads],
+            'body': body,
+            'headline': headline,
+            'description': description,
+            'link_caption': link_caption,
+            'full_text': full_text,
+            'creative_hash': [creative_hash(*parts) for parts in zip(body, headline, description, link_caption)],
+            'text_length': features['text_length'],
+            'has_emoji': features['has_emoji'],
+            'has_hashtags': features['has_hashtags'],
+            'hashtags': features['hashtags'],
+            'mentions': features['mentions'],
+            'cta_detected': features['cta_detected'],
+            'days_active': days_active,
+        }
+
+    def _map_unique(self, values: List, func) -> pd.Series:
+        """Aplicar func uma vez por valor distinto e expandir para a coluna"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), sort=False)
+        mapped = [func(value) for value in uniques] + [func(None)]  # código -1 = ausente
+        return pd.Series([mapped[code] for code in codes])
+
+
+def _first_items(ads: List[Dict], field: str) -> List[Optional[str]]:
+    """_extract_text de uma coluna inteira (sem chamada de método por ad)"""
+    values = [ad.get(field) for ad in ads]
+    return [value[0] if isinstance(value, list) and value else None for value in values]
+
+
+def _chunked(ads: Iterable[Dict], chunk_size: int) -> Iterator[List[Dict]]:
+    iterator = iter(ads)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Parser de cada processo do pool (recebido uma vez, no initializer)
+_worker_parser: Optional[AdParser] = None
+
+
+def _init_worker(parser: AdParser):
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _parse_chunk(chunk: List[Dict], fields: Optional[List[str]], as_of: datetime) -> pd.DataFrame:
+    return _worker_parser.parse_batch(chunk, fields, as_of=as_of)
+
+
+def utc_now() -> datetime:
+    """Agora em UTC sem fuso: o referencial das datas parseadas"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _as_of(as_of: Optional[datetime]) -> datetime:
+    """Instante de referência de days_active (naive UTC, como _parse_date)"""
+    if as_of is None:
+        return utc_now()
+    if isinstance(as_of, pd.Timestamp):
+        as_of = as_of.to_pydatetime()
+    if as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    return as_of
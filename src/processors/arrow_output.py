@@ -0,0 +1,69 @@
+# processors/arrow_output.py
+from typing import Dict
+import pandas as pd
+import pyarrow as pa
+
+# Schema da saída Arrow do AdParser (mesmas colunas de parse_batch)
+AD_SCHEMA = pa.schema([
+    ('ad_id', pa.string()),
+    ('page_name', pa.dictionary(pa.int32(), pa.string())),  # poucas páginas, muitos ads
+    ('page_id', pa.string()),
+    ('start_date', pa.timestamp('us')),
+    ('end_date', pa.timestamp('us')),
+    ('is_active', pa.bool_()),
+    ('platforms', pa.string()),
+    ('snapshot_url', pa.string()),
+    ('body', pa.string()),
+    ('headline', pa.string()),
+    ('description', pa.string()),
+    ('link_caption', pa.string()),
+    ('full_text', pa.string()),
+    ('creative_hash', pa.string()),
+    ('text_length', pa.int64()),
+    ('has_emoji', pa.bool_()),
+    ('has_hashtags', pa.bool_()),
+    ('hashtags', pa.list_(pa.string())),
+    ('mentions', pa.list_(pa.string())),
+    ('cta_detected', pa.string()),
+    ('days_active', pa.int64()),
+])
+
+
+def columns_to_table(columns: Dict[str, object]) -> pa.Table:
+    """
+    Montar a tabela Arrow direto das colunas do parser
+
+    Listas Python e Series do pandas são convertidas coluna a coluna, sem
+    passar por um dicionário por ad.
+    """
+    arrays = []
+    for field in AD_SCHEMA:
+        values = columns[field.name]
+
+        if pa.types.is_dictionary(field.type):
+            array = _to_array(values, field.type.value_type).dictionary_encode()
+            array = array.cast(field.type)
+        else:
+            array = _to_array(values, field.type)
+
+        arrays.append(array)
+
+    return pa.Table.from_arrays(arrays, schema=AD_SCHEMA)
+
+
+def table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    DataFrame para storage/análise a partir da tabela Arrow
+
+    page_name vira categoria; hashtags/mentions viram arrays por linha.
+    """
+    return table.to_pandas()
+
+
+def _to_array(values, arrow_type: pa.DataType) -> pa.Array:
+    if isinstance(values, pd.Series):
+        if pd.api.types.is_float_dtype(values.dtype) and pa.types.is_integer(arrow_type):
+            # days_active com NaN: inteiro nulável no Arrow
+            return pa.Array.from_pandas(values.astype('Int64'), type=arrow_type)
+        return pa.Array.from_pandas(values, type=arrow_type)
+    return pa.array(values, type=arrow_type, from_pandas=True)
@@ -0,0 +1,179 @@
+# processors/cta_matcher.py
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+# Dicionários padrão de CTA por idioma. A ordem define a prioridade do CTA
+# principal: primeiro o idioma, depois a posição da frase na lista.
+CTA_DICTIONARIES: Dict[str, List[str]] = {
+    'en': [
+        'learn more', 'sign up', 'get started', 'try free',
+        'download', 'shop now', 'book now', 'subscribe',
+        'join now', 'apply now', 'contact us', 'see more'
+    ],
+    'pt': [
+        'saiba mais', 'cadastre-se', 'comece agora', 'experimente grátis',
+        'experimente gratis', 'teste grátis', 'teste gratis', 'baixe agora',
+        'compre agora', 'reserve agora', 'assine agora', 'inscreva-se',
+        'junte-se', 'candidate-se', 'fale conosco', 'ver mais', 'garanta já',
+        'peça já', 'quero saber mais'
+    ],
+    'es': [
+        'más información', 'mas informacion', 'regístrate', 'registrate',
+        'empieza ahora', 'prueba gratis', 'descarga', 'compra ahora',
+        'reserva ahora', 'suscríbete', 'suscribete', 'únete', 'contáctanos',
+        'ver más'
+    ],
+}
+
+
+class CTAHit(NamedTuple):
+    """Ocorrência de um CTA no texto (posições no texto original)"""
+    cta: str
+    language: str
+    start: int
+    end: int
+
+
+class CTAMatcher:
+    """
+    Detector de CTAs multi-idioma em uma passada
+
+    As frases de todos os dicionários viram uma trie, compilada numa única
+    regex (alternativas aninhadas por prefixo comum). O motor de regex
+    percorre o texto uma vez e, em cada posição, só segue os ramos da trie
+    compatíveis com o próximo caractere; o custo depende do tamanho do
+    texto e quase nada do número de frases.
+
+    A comparação é por substring em minúsculas, como o detector anterior
+    ('download' casa com 'downloads').
+    """
+
+    def __init__(self, dictionaries: Dict[str, Iterable[str]] = None, languages: Sequence[str] = None):
+        """
+        Args:
+            dictionaries: idioma -> frases (padrão: CTA_DICTIONARIES)
+            languages: idiomas ativos, em ordem de prioridade (padrão: todos)
+        """
+        self._dictionaries: Dict[str, List[str]] = {}
+        for language, phrases in (CTA_DICTIONARIES if dictionaries is None else dictionaries).items():
+            self.register(language, phrases)
+
+        self.languages = list(languages) if languages else None
+        self._compiled = None
+
+    @classmethod
+    def from_json(cls, path: str, languages: Sequence[str] = None, extend_defaults: bool = True) -> 'CTAMatcher':
+        """
+        Carregar dicionários de um JSON {"idioma": ["frase", ...]}
+
+        Com extend_defaults, as frases se somam aos dicionários padrão.
+        """
+        with open(path, encoding='utf-8') as f:
+            loaded = json.load(f)
+
+        matcher = cls({} if not extend_defaults else None, languages)
+        for language, phrases in loaded.items():
+            matcher.register(language, phrases)
+        return matcher
+
+    def register(self, language: str, phrases: Iterable[str]):
+        """Adicionar frases a um idioma (novo ou existente)"""
+        current = self._dictionaries.setdefault(language, [])
+        for phrase in phrases:
+            phrase = phrase.strip().lower()
+            if phrase and phrase not in current:
+                current.append(phrase)
+        self._compiled = None
+
+    @property
+    def phrases(self) -> List[str]:
+        """Frases ativas em ordem de prioridade"""
+        return list(self._priority())
+
+    def find_all(self, text: str) -> List[CTAHit]:
+        """Todas as ocorrências de CTAs, ordenadas por posição"""
+        if not text:
+            return []
+
+        pattern, trie, _ = self._compile()
+        if pattern is None:
+            return []
+
+        lowered = text.lower()
+        offsets = _offsets(text) if len(lowered) != len(text) else None
+
+        hits = []
+        match = pattern.search(lowered)
+        while match:
+            start = match.start()
+            # A regex devolve a frase mais longa em cada posição; frases que
+            # são prefixo dela saem da trie
+            node = trie
+            for index, char in enumerate(match.group(), 1):
+                node = node[char]
+                if '' in node:
+                    phrase, language = node['']
+                    end = start + index
+                    if offsets:
+                        hits.append(CTAHit(phrase, language, offsets[start], offsets[end - 1] + 1))
+                    else:
+                        hits.append(CTAHit(phrase, language, start, end))
+
+            # Recomeçar na posição seguinte: ocorrências sobrepostas contam
+            match = pattern.search(lowered, start + 1)
+        return hits
+
+    def primary(self, text: str, hits: List[CTAHit] = None) -> Optional[str]:
+        """CTA de maior prioridade presente no texto (ou None)"""
+        if hits is None:
+            hits = self.find_all(text)
+        if not hits:
+            return None
+        _, _, rank = self._compile()
+        return min(hits, key=lambda hit: rank[hit.cta]).cta
+
+    def _priority(self) -> Iterable[tuple]:
+        """(frase, idioma) sem repetição, em ordem de prioridade"""
+        languages = self.languages if self.languages is not None else list(self._dictionaries)
+        seen = set()
+        for language in languages:
+            for phrase in self._dictionaries.get(language, []):
+                if phrase not in seen:
+                    seen.add(phrase)
+                    yield phrase, language
+
+    def _compile(self):
+        if self._compiled is None:
+            trie: Dict = {}
+            rank = {}
+            for phrase, language in self._priority():
+                rank[phrase] = len(rank)
+                node = trie
+                for char in phrase:
+                    node = node.setdefault(char, {})
+                node[''] = (phrase, language)
+
+            pattern = re.compile(_trie_regex(trie)) if trie else None
+            self._compiled = (pattern, trie, rank)
+        return self._compiled
+
+
+def _trie_regex(node: Dict) -> str:
+    """Regex equivalente à trie (gulosa: prefere a frase mais longa)"""
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        return f'(?:{body})?'
+    return body
+
+
+def _offsets(text: str) -> List[int]:
+    """Posição no texto original de cada caractere de text.lower()"""
+    offsets = []
+    for index, char in enumerate(text):
+        offsets.extend([index] * len(char.lower()))
+    return offsets
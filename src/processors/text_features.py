@@ -0,0 +1,98 @@
+# processors/text_features.py
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Optional
+from src.processors.cta_matcher import CTAHit, CTAMatcher
+
+# Padrões compilados uma vez por processo
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map
+    "\U0001F1E0-\U0001F1FF"  # flags
+    "]+",
+    flags=re.UNICODE
+)
+HASHTAG_PATTERN = re.compile(r'#\w+')
+MENTION_PATTERN = re.compile(r'@\w+')
+
+
+def creative_hash(*parts: Optional[str]) -> Optional[str]:
+    """
+    Hash do criativo (body, headline, description, link_caption)
+
+    Texto normalizado antes do hash: NFC, espaços nas pontas removidos e
+    None igual a vazio. Criativo sem texto nenhum não tem hash.
+    """
+    normalized = [unicodedata.normalize('NFC', part).strip() if part else '' for part in parts]
+    if not any(normalized):
+        return None
+    return hashlib.sha1('\x1f'.join(normalized).encode('utf-8')).hexdigest()
+
+
+class TextFeatureExtractor:
+    """
+    Features de texto de um ad numa única chamada
+
+    Substitui as chamadas separadas de emoji/hashtag/mention/CTA do
+    AdParser. Cada varredura só roda quando um teste barato (feito em C)
+    indica que pode haver resultado: sem '#' não há hashtag, sem '@' não
+    há mention, texto ASCII não tem emoji. CTAs vêm do CTAMatcher
+    (todos os idiomas numa varredura).
+    """
+
+    def __init__(self, cta_matcher: CTAMatcher = None, cache_size: int = 50_000):
+        """
+        Args:
+            cta_matcher: Detector de CTA (padrão: dicionários embutidos)
+            cache_size: Textos com features em memória; criativos repetidos
+                dentro do mesmo processo (o mesmo ad em várias keywords ou
+                páginas) não são reanalisados. Criativos já salvos no
+                database são reanalisados numa nova execução. 0 desativa.
+        """
+        self.cta_matcher = cta_matcher or CTAMatcher()
+        self.cache_size = cache_size
+        self._cache: Dict[str, Dict] = {}
+
+    def __getstate__(self):
+        # O cache não vai para os processos do pool de parsing
+        return {**self.__dict__, '_cache': {}}
+
+    def extract(self, text: str) -> Dict:
+        """
+        Returns:
+            text_length, has_emoji, hashtags, has_hashtags, mentions e
+            cta_detected (CTA principal, ver CTAMatcher.primary)
+        """
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+
+        features = self._extract(text)
+        if self.cache_size:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[text] = features
+        return features
+
+    def _extract(self, text: str) -> Dict:
+        hashtags: List[str] = HASHTAG_PATTERN.findall(text) if '#' in text else []
+
+        return {
+            'text_length': len(text),
+            'has_emoji': not text.isascii() and EMOJI_PATTERN.search(text) is not None,
+            'has_hashtags': len(hashtags) > 0,
+            'hashtags': hashtags,
+            'mentions': MENTION_PATTERN.findall(text) if '@' in text else [],
+            'cta_detected': self.detect_cta(text),
+        }
+
+    def detect_cta(self, text: str) -> Optional[str]:
+        """CTA de maior prioridade presente no texto"""
+        return self.cta_matcher.primary(text)
+
+    def find_ctas(self, text: str) -> List[CTAHit]:
+        """Todas as ocorrências de CTA, com idioma e posição"""
+        return self.cta_matcher.find_all(text)
@@ -2,6 +2,8 @@
 import schedule
 import time
 from src.main import AdIntelligencePipeline
+from src.config import Config
+from src.storage.parquet_archive import ParquetArchive
 import logging
 from datetime import datetime
 
@@ -36,7 +38,8 @@ def daily_collection():
         results = pipeline.collect_and_analyze(
             keywords=keywords,
             countries=['US'],
-            limit_per_keyword=50
+            limit_per_keyword=50,
+            max_concurrency=Config.API_MAX_CONCURRENCY
         )
 
         # Gerar relatório
@@ -44,6 +47,11 @@ def daily_collection():
             output_path=f'reports/daily_report_{datetime.now().strftime("%Y%m%d")}.txt'
         )
 
+        # Levar a coleta do dia para o arquivo Parquet
+        if Config.PARQUET_ARCHIVE_PATH:
+            synced = ParquetArchive(Config.PARQUET_ARCHIVE_PATH).sync(pipeline.db)
+            logger.info(f"{synced} ads sincronizados no arquivo Parquet")
+
         logger.info("✅ Coleta diária concluída com sucesso")
 
     except Exception as e:
@@ -68,7 +76,7 @@ def weekly_competitor_analysis():
             'Kapwing'
         ]
 
-        results = pipeline.analyze_competitors(competitors)
+        results = pipeline.analyze_competitors(competitors, page_ids=Config.COMPETITOR_PAGE_IDS)
 
         if results:
             # Salvar análise comparativa
@@ -84,6 +92,21 @@ def weekly_competitor_analysis():
         logger.error(f"❌ Erro na análise de competitors: {e}")
 
 
+def _analytics_engine(pipeline, archive):
+    """DuckDBEngine sobre o arquivo (ou o SQLite) se ANALYTICS_ENGINE=duckdb"""
+    if Config.ANALYTICS_ENGINE != 'duckdb':
+        return None
+
+    from src.analyzers.duckdb_engine import DuckDBEngine
+    try:
+        if archive:
+            return DuckDBEngine.from_parquet(archive.root)
+        return DuckDBEngine.from_sqlite(pipeline.db.db_path)
+    except (ImportError, RuntimeError) as e:
+        logger.warning(f"Engine DuckDB indisponível, usando pandas: {e}")
+        return None
+
+
 def monthly_deep_analysis():
     """Job mensal de análise profunda"""
     logger.info("=" * 50)
@@ -93,11 +116,20 @@ def monthly_deep_analysis():
     try:
         pipeline = AdIntelligencePipeline()
         from src.analyzers.advanced_analytics import AdvancedAnalyzer
-        from src.storage.database import Ad
 
-        # Buscar todos os dados do último mês
-        all_ads = pipeline.db.session.query(Ad).all()
-        df = pipeline.db._to_dataframe(all_ads)
+        # Scans longos leem do arquivo Parquet (sincronizado antes) quando
+        # configurado; senão, do SQLite
+        archive = None
+        if Config.PARQUET_ARCHIVE_PATH:
+            archive = ParquetArchive(Config.PARQUET_ARCHIVE_PATH)
+            archive.sync(pipeline.db)
+
+        # Clustering precisa do texto de todos os ads de uma vez: só as
+        # colunas usadas
+        if archive:
+            df = archive.read(columns=AdvancedAnalyzer.CLUSTER_COLUMNS)
+        else:
+            df = pipeline.db.get_all(columns=AdvancedAnalyzer.CLUSTER_COLUMNS)
 
         if len(df) > 0:
             # Análise avançada
@@ -110,8 +142,17 @@ def monthly_deep_analysis():
                 index=False
             )
 
-            # Tendências temporais
-            trends = advanced.analyze_trends_over_time(df)
+            # Tendências temporais (SQL no DuckDB ou agregadas chunk a chunk)
+            engine = _analytics_engine(pipeline, archive)
+            if engine:
+                with engine:
+                    trends = AdvancedAnalyzer(engine).analyze_trends_over_time()
+            else:
+                if archive:
+                    chunks = archive.iter_batches(columns=AdvancedAnalyzer.TREND_COLUMNS)
+                else:
+                    chunks = pipeline.db.iter_chunks(columns=AdvancedAnalyzer.TREND_COLUMNS)
+                trends = advanced.analyze_trends_over_chunks(chunks)
             trends.to_csv(
                 f'reports/trends_{datetime.now().strftime("%Y%m%d")}.csv'
             )
@@ -1,10 +1,23 @@
 # storage/database.py
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import (
+    create_engine, event, func, inspect, or_, select, text, type_coerce,
+    Column, Integer, Float, String, Text, DateTime, Boolean
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List
+from typing import Iterator, List, Optional
+import json
+import os
+import threading
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from src.config import Config
+from src.processors.arrow_output import table_to_pandas
 
 Base = declarative_base()
 
@@ -35,6 +48,9 @@ class Ad(Base):
     description = Column(Text)
     link_caption = Column(String(500))
     full_text = Column(Text)
+    # Ads novos guardam o texto só em creatives; as colunas de texto acima
+    # ficam vazias (registros antigos ou parciais ainda as usam)
+    creative_hash = Column(String(40), index=True)
 
     # Métricas de texto
     text_length = Column(Integer)
@@ -48,84 +64,506 @@ class Ad(Base):
     search_keyword = Column(String(200), index=True)
 
 
+class Creative(Base):
+    """Texto e features de cada criativo distinto (ads repetem muito texto)"""
+    __tablename__ = 'creatives'
+
+    creative_hash = Column(String(40), primary_key=True)
+    body = Column(Text)
+    headline = Column(String(500))
+    description = Column(Text)
+    link_caption = Column(String(500))
+    full_text = Column(Text)
+    text_length = Column(Integer)
+    has_emoji = Column(Boolean)
+    has_hashtags = Column(Boolean)
+    hashtags = Column(Text)  # JSON array as string
+    mentions = Column(Text)  # JSON array as string
+    cta_detected = Column(String(50), index=True)
+
+
+# Colunas do ad que moram na tabela creatives
+CREATIVE_COLUMNS = [c.name for c in Creative.__table__.columns if c.name != 'creative_hash']
+
+
+class AdKeyword(Base):
+    """Todas as keywords em que cada ad apareceu (Ad.search_keyword guarda só a primeira)"""
+    __tablename__ = 'ad_keywords'
+
+    ad_id = Column(String(100), primary_key=True)
+    keyword = Column(String(200), primary_key=True, index=True)
+
+
+class CollectionWatermark(Base):
+    """Data de início mais recente já coletada por keyword (coleta incremental)"""
+    __tablename__ = 'collection_watermarks'
+
+    keyword = Column(String(200), primary_key=True)
+    last_start_date = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+# Uma engine (e um pool de conexões) por arquivo em cada processo: threads
+# e instâncias de AdDatabase do mesmo processo compartilham as conexões
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_path: str) -> Engine:
+    """Engine SQLite do processo atual para o arquivo (WAL e pragmas ligados)"""
+    key = (os.getpid(), os.path.abspath(db_path))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            engine = create_engine(
+                f'sqlite:///{db_path}',
+                connect_args={'timeout': Config.DB_BUSY_TIMEOUT, 'check_same_thread': False},
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_POOL_SIZE
+            )
+            event.listen(engine, 'connect', _configure_connection)
+            _engines[key] = engine
+        return engine
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    """
+    Pragmas de cada conexão nova
+
+    WAL: leitores (relatórios, alertas) não bloqueiam o escritor e vice-versa.
+    synchronous=NORMAL é seguro em WAL e evita um fsync por commit. Cache de
+    páginas e tabelas temporárias em memória aceleram ingestão em lote.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA cache_size=-{Config.DB_CACHE_SIZE_MB * 1024}')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute(f'PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT * 1000)}')
+    cursor.close()
+
+
 class AdDatabase:
     """
     Interface para operações de database
+
+    Cada operação usa uma sessão curta (session_scope), que devolve a
+    conexão ao pool ao terminar; nenhuma transação fica aberta entre
+    chamadas. `session` continua disponível para consultas ad hoc (uma
+    sessão por thread).
     """
 
+    SQL_BATCH_SIZE = 500  # linhas/ids por comando (limite de variáveis do SQLite)
+    READ_BATCH_SIZE = 10_000  # linhas por fetch nas leituras em DataFrame
+
     def __init__(self, db_path: str = 'data/ads_intelligence.db'):
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.db_path = db_path
+        self.engine = get_engine(db_path)
         Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        self._migrate()
+        # expire_on_commit=False: objetos continuam legíveis depois da sessão
+        self._session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._scoped_session = scoped_session(self._session_factory)
+
+    @property
+    def session(self) -> Session:
+        """Sessão da thread atual (consultas ad hoc)"""
+        return self._scoped_session()
 
-    def save_ads(self, ads_df: pd.DataFrame, search_keyword: str = None):
+    @contextmanager
+    def session_scope(self, write: bool = False) -> Iterator[Session]:
+        """
+        Sessão curta: commit no fim, rollback em erro
+
+        Com write=True a transação começa com BEGIN IMMEDIATE: o lock de
+        escrita é pego no início. Uma transação que lê e depois escreve
+        pode falhar em WAL se outro processo gravou no meio; assim ela só
+        espera o busy_timeout.
+        """
+        session = self._session_factory()
+        if write:
+            session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def close(self):
+        """Liberar a sessão da thread atual (a engine segue no processo)"""
+        self._scoped_session.remove()
+
+    def _migrate(self):
+        """Adicionar colunas novas a databases criados por versões anteriores"""
+        existing = {column['name'] for column in inspect(self.engine).get_columns('ads')}
+        with self.engine.begin() as conn:
+            if 'creative_hash' not in existing:
+                conn.execute(text('ALTER TABLE ads ADD COLUMN creative_hash VARCHAR(40)'))
+                conn.execute(text('CREATE INDEX IF NOT EXISTS ix_ads_creative_hash ON ads (creative_hash)'))
+
+    def save_ads(self, ads_df: pd.DataFrame, search_keyword: str = None) -> dict:
         """
         Salvar ads no database
+
+        Aceita o DataFrame de AdParser.parse_batch ou a tabela Arrow de
+        AdParser.parse_table.
+
+        Escrita em lote numa transação: uma consulta por SQL_BATCH_SIZE ids
+        para achar os ads já salvos e INSERT ... ON CONFLICT(ad_id) DO
+        UPDATE em lotes só para ads novos ou alterados. Ads existentes mudam
+        apenas de status (is_active/end_date) e têm colunas vazias
+        completadas.
+
+        Returns:
+            Contagem de linhas inserted, updated e unchanged
         """
+        if isinstance(ads_df, pa.Table):
+            ads_df = table_to_pandas(ads_df)
+
         ads_df['search_keyword'] = search_keyword
         ads_df['collected_at'] = datetime.now()
 
-        # Converter para records
-        for _, row in ads_df.iterrows():
-            # Verificar se já existe
-            existing = self.session.query(Ad).filter_by(ad_id=row['ad_id']).first()
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        if ads_df.empty:
+            return counts
+
+        columns = [c.name for c in Ad.__table__.columns if c.name != 'id' and c.name in ads_df]
+        records = self._to_ad_records(ads_df[columns])
+
+        with self.session_scope(write=True) as session:
+            if 'creative_hash' in ads_df:
+                self._insert_creatives(session, ads_df)
 
-            if existing:
-                # Atualizar se mudou status
-                if row.get('is_active') != existing.is_active:
-                    existing.is_active = row['is_active']
-                    existing.end_date = row.get('end_date')
+            existing = self._load_ad_rows(session, [record['ad_id'] for record in records])
+            pending = self._merge_pending(records, existing, counts)
+
+            rows = [{column: row.get(column) for column in columns} for row in pending]
+            if rows:
+                insert = sqlite_insert(Ad.__table__)
+                upsert = insert.on_conflict_do_update(
+                    index_elements=['ad_id'],
+                    set_={column: insert.excluded[column] for column in columns if column != 'ad_id'}
+                )
+                for start in range(0, len(rows), self.SQL_BATCH_SIZE):
+                    session.execute(upsert, rows[start:start + self.SQL_BATCH_SIZE])
+
+            if search_keyword:
+                self._insert_keyword_matches(session, ads_df['ad_id'].tolist(), search_keyword)
+
+        return counts
+
+    def _merge_pending(self, records: List[dict], existing: dict, counts: dict) -> List[dict]:
+        """Linhas a gravar (ads novos ou alterados), contando cada record"""
+
+        # Linha final por ad_id (repetições no mesmo lote são mescladas)
+        pending = {}
+        for record in records:
+            ad_id = record['ad_id']
+            current = pending.get(ad_id) or existing.get(ad_id)
+
+            if current is None or ad_id is None:
+                pending[ad_id if ad_id is not None else object()] = record
+                counts['inserted'] += 1
+                continue
+
+            merged, changed = self._merge_ad(current, record)
+            if changed:
+                pending[ad_id] = merged
+                counts['updated'] += 1
             else:
-                # Criar novo
-                ad = Ad(**row.to_dict())
-                self.session.add(ad)
+                counts['unchanged'] += 1
+
+        return list(pending.values())
+
+    def _load_ad_rows(self, session: Session, ad_ids: List[str]) -> dict:
+        """ad_id -> linha salva (dict), em lotes de SQL_BATCH_SIZE ids"""
+        unique_ids = [ad_id for ad_id in dict.fromkeys(ad_ids) if ad_id is not None]
+        rows = {}
+        for start in range(0, len(unique_ids), self.SQL_BATCH_SIZE):
+            chunk = unique_ids[start:start + self.SQL_BATCH_SIZE]
+            query = select(Ad.__table__).where(Ad.ad_id.in_(chunk))
+            for row in session.execute(query).mappings():
+                rows[row['ad_id']] = dict(row)
+        return rows
+
+    @staticmethod
+    def _merge_ad(current: dict, record: dict) -> tuple:
+        """Aplicar um record novo a um ad já salvo: (linha final, mudou?)"""
+        merged = dict(current)
+        changed = False
+
+        # Atualizar se mudou status (registros parciais podem não ter status)
+        if record.get('is_active') is not None and record['is_active'] != current.get('is_active'):
+            merged['is_active'] = record['is_active']
+            merged['end_date'] = record.get('end_date')
+            changed = True
+
+        # Completar colunas que um registro parcial anterior deixou vazias.
+        # Com creative_hash, o texto está em creatives: NULL inline não é
+        # coluna vazia
+        has_creative = merged.get('creative_hash') is not None
+        for column, value in record.items():
+            if has_creative and column in CREATIVE_COLUMNS:
+                continue
+            if value is not None and merged.get(column) is None:
+                merged[column] = value
+                changed = True
+
+        return merged, changed
+
+    def _insert_creatives(self, session: Session, ads_df: pd.DataFrame):
+        """Gravar cada criativo novo uma vez (os já existentes são mantidos)"""
+        creatives = ads_df.loc[ads_df['creative_hash'].notna(), ['creative_hash'] + CREATIVE_COLUMNS]
+        creatives = creatives.drop_duplicates('creative_hash')
+
+        rows = self._to_records(self._to_columns(creatives))
+        for start in range(0, len(rows), self.SQL_BATCH_SIZE):
+            session.execute(
+                sqlite_insert(Creative).on_conflict_do_nothing(),
+                rows[start:start + self.SQL_BATCH_SIZE]
+            )
+
+    def _to_ad_records(self, frame: pd.DataFrame) -> List[dict]:
+        """Records da tabela ads: texto fica em creatives quando há hash"""
+        columns = self._to_columns(frame)
+        hashes = columns.get('creative_hash')
+        if hashes is not None:
+            for column in CREATIVE_COLUMNS:
+                if column in columns:
+                    columns[column] = [None if h else v for h, v in zip(hashes, columns[column])]
+        return self._to_records(columns)
+
+    def add_keyword_matches(self, ad_ids: List[str], keyword: str):
+        """Registrar que ads já salvos também apareceram em outra keyword"""
+        with self.session_scope(write=True) as session:
+            self._insert_keyword_matches(session, ad_ids, keyword)
+
+    def _insert_keyword_matches(self, session: Session, ad_ids: List[str], keyword: str):
+        rows = [{'ad_id': ad_id, 'keyword': keyword} for ad_id in dict.fromkeys(ad_ids) if ad_id]
+        if rows:
+            session.execute(
+                sqlite_insert(AdKeyword).on_conflict_do_nothing(),
+                rows
+            )
+
+    def _to_columns(self, frame: pd.DataFrame) -> dict:
+        """Adaptar colunas do DataFrame para SQL (listas em JSON, NaN/NaT -> None)"""
+        object_columns = {column for column, dtype in frame.dtypes.items() if dtype == object}
+        frame = frame.astype(object)
+        frame = frame.where(frame.notna(), None)
+
+        columns = {}
+        for column in frame.columns:
+            values = frame[column].tolist()
+            if column in object_columns and any(isinstance(value, (list, np.ndarray)) for value in values):
+                # Listas do Arrow chegam como arrays numpy
+                values = [
+                    json.dumps(list(value), ensure_ascii=False) if isinstance(value, (list, np.ndarray)) else value
+                    for value in values
+                ]
+            columns[column] = values
+        return columns
+
+    @staticmethod
+    def _to_records(columns: dict) -> List[dict]:
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def all_ad_ids_known(self, ad_ids: List[str]) -> bool:
+        """
+        True se todos os ad_ids já estão no database (uma query por página)
 
-        self.session.commit()
+        Usa conexão própria do pool: é chamado pelas threads do coletor
+        assíncrono.
+        """
+        unique_ids = set(filter(None, ad_ids))
+        if not unique_ids:
+            return False
+
+        query = select(func.count()).select_from(Ad).where(Ad.ad_id.in_(unique_ids))
+        with self.engine.connect() as conn:
+            known = conn.execute(query).scalar()
+        return known == len(unique_ids)
+
+    def get_watermark(self, keyword: str) -> Optional[datetime]:
+        """Data de início mais recente coletada para a keyword"""
+        with self.session_scope() as session:
+            watermark = session.get(CollectionWatermark, keyword)
+            return watermark.last_start_date if watermark else None
+
+    def update_watermark(self, keyword: str, last_start_date: datetime):
+        """Avançar a watermark da keyword (nunca retrocede)"""
+        if last_start_date is None or pd.isna(last_start_date):
+            return
+
+        if isinstance(last_start_date, pd.Timestamp):
+            last_start_date = last_start_date.to_pydatetime()
+
+        with self.session_scope(write=True) as session:
+            watermark = session.get(CollectionWatermark, keyword)
+            if watermark is None:
+                watermark = CollectionWatermark(keyword=keyword)
+                session.add(watermark)
+            elif watermark.last_start_date and watermark.last_start_date >= last_start_date:
+                return
 
-    def get_ads_by_keyword(self, keyword: str) -> pd.DataFrame:
-        """Buscar ads por keyword"""
-        ads = self.session.query(Ad).filter_by(search_keyword=keyword).all()
-        return self._to_dataframe(ads)
+            watermark.last_start_date = last_start_date
+            watermark.updated_at = datetime.now()
 
-    def get_ads_by_page(self, page_name: str) -> pd.DataFrame:
+    def get_all(self, columns: List[str] = None) -> pd.DataFrame:
+        """Todos os ads (columns: projeção, padrão todas as colunas de Ad)"""
+        return self._read_ads(columns=columns)
+
+    def get_ads_by_keyword(self, keyword: str, columns: List[str] = None) -> pd.DataFrame:
+        """Buscar ads por keyword (inclusive os que apareceram antes em outra)"""
+        matched_ids = select(AdKeyword.ad_id).where(AdKeyword.keyword == keyword)
+        return self._read_ads(
+            or_(Ad.search_keyword == keyword, Ad.ad_id.in_(matched_ids)),
+            columns=columns
+        )
+
+    def get_ads_by_page(self, page_name: str, columns: List[str] = None) -> pd.DataFrame:
         """Buscar ads por página"""
-        ads = self.session.query(Ad).filter_by(page_name=page_name).all()
-        return self._to_dataframe(ads)
+        return self._read_ads(Ad.page_name == page_name, columns=columns)
 
-    def get_top_performers(self, min_days: int = 30) -> pd.DataFrame:
+    def get_top_performers(self, min_days: int = 30, columns: List[str] = None) -> pd.DataFrame:
         """
         Buscar ads que rodaram por muito tempo (signal de performance)
         """
-        ads = self.session.query(Ad).filter(Ad.days_active >= min_days).all()
-        return self._to_dataframe(ads).sort_values('days_active', ascending=False)
+        return self._read_ads(Ad.days_active >= min_days, columns=columns, order_by=Ad.days_active.desc())
 
-    def get_active_ads(self) -> pd.DataFrame:
+    def get_active_ads(self, columns: List[str] = None) -> pd.DataFrame:
         """Buscar ads atualmente ativos"""
-        ads = self.session.query(Ad).filter_by(is_active=True).all()
-        return self._to_dataframe(ads)
+        return self._read_ads(Ad.is_active == True, columns=columns)  # noqa: E712
+
+    def iter_chunks(self, filter=None, columns: List[str] = None, chunk_size: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Ads em DataFrames de até chunk_size linhas, na ordem de inserção
+
+        Para jobs sobre o corpus inteiro (relatórios, análises): só um chunk
+        fica em memória por vez. O índice continua de um chunk para o
+        outro, como se fosse um DataFrame só.
 
-    def _to_dataframe(self, ads: List[Ad]) -> pd.DataFrame:
-        """Converter list de Ad objects para DataFrame"""
-        if not ads:
-            return pd.DataFrame()
+        Args:
+            filter: Condição SQLAlchemy (ex.: Ad.is_active == True)
+            columns: Projeção (padrão: todas as colunas de Ad)
+            chunk_size: Linhas por chunk (padrão: READ_BATCH_SIZE)
+        """
+        chunk_size = chunk_size or self.READ_BATCH_SIZE
+        query = self._select_ads(columns).order_by(Ad.id)
+        if filter is not None:
+            query = query.where(filter)
 
-        data = []
-        for ad in ads:
-            row = {c.name: getattr(ad, c.name) for c in ad.__table__.columns}
-            data.append(row)
+        start = 0
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=chunk_size).execute(query)
+            names = list(result.keys())
+            for rows in result.partitions(chunk_size):
+                chunk = self._typed_frame(dict(zip(names, map(list, zip(*rows)))))
+                chunk.index = pd.RangeIndex(start, start + len(chunk))
+                start += len(chunk)
+                yield chunk
 
-        return pd.DataFrame(data)
+    def _read_ads(self, where=None, columns: List[str] = None, order_by=None) -> pd.DataFrame:
+        """
+        DataFrame direto do cursor, sem objetos ORM
+
+        Só as colunas pedidas entram no SELECT; texto e features de
+        criativos compartilhados vêm do LEFT JOIN com creatives. As linhas
+        são lidas em lotes de READ_BATCH_SIZE e transpostas em listas por
+        coluna; datas e booleanos são convertidos coluna a coluna.
+        """
+        query = self._select_ads(columns)
+        if where is not None:
+            query = query.where(where)
+        if order_by is not None:
+            query = query.order_by(order_by)
+
+        with self.engine.connect() as conn:
+            result = conn.execute(query)
+            names = list(result.keys())
+            values = {name: [] for name in names}
+            for rows in result.partitions(self.READ_BATCH_SIZE):
+                for name, column in zip(names, zip(*rows)):
+                    values[name].extend(column)
+
+        return self._typed_frame(values)
+
+    def _select_ads(self, columns: List[str] = None):
+        """SELECT das colunas de Ad, com o texto de creatives quando há hash"""
+        ads = Ad.__table__
+        creatives = Creative.__table__
+        names = columns or [column.name for column in ads.columns]
+
+        unknown = [name for name in names if name not in ads.columns]
+        if unknown:
+            raise ValueError(f"Colunas inexistentes em ads: {', '.join(unknown)}")
+
+        selected = []
+        for name in names:
+            column = ads.columns[name]
+            if name in CREATIVE_COLUMNS:
+                column = func.coalesce(column, creatives.columns[name])
+            # Datas e booleanos saem crus do SQLite e são convertidos por coluna
+            if isinstance(ads.columns[name].type, DateTime):
+                column = type_coerce(column, String)
+            elif isinstance(ads.columns[name].type, Boolean):
+                column = type_coerce(column, Integer)
+            selected.append(column.label(name))
+
+        query = select(*selected)
+        if any(name in CREATIVE_COLUMNS for name in names):
+            query = query.select_from(
+                ads.outerjoin(creatives, ads.c.creative_hash == creatives.c.creative_hash)
+            )
+        else:
+            query = query.select_from(ads)
+        return query
+
+    @staticmethod
+    def _typed_frame(values: dict) -> pd.DataFrame:
+        """Colunas cruas do SQLite -> DataFrame com os tipos das colunas de Ad"""
+        ads = Ad.__table__
+        frame = {}
+        for name, column in values.items():
+            column_type = ads.columns[name].type
+            if isinstance(column_type, DateTime):
+                frame[name] = pd.to_datetime(pd.Series(column, dtype=object), format='ISO8601').astype('datetime64[us]')
+            elif isinstance(column_type, Boolean):
+                if None in column:
+                    frame[name] = pd.Series([None if v is None else bool(v) for v in column], dtype=object)
+                else:
+                    frame[name] = pd.Series(np.array(column, dtype=bool))
+            elif isinstance(column_type, Integer):
+                # Sempre numérico, mesmo com a coluna toda NULL: int64, ou
+                # float64 com NaN se houver NULL
+                numbers = pd.Series(column, dtype='Int64')
+                frame[name] = numbers.astype('float64') if numbers.hasnans else numbers.astype('int64')
+            elif isinstance(column_type, Float):
+                frame[name] = pd.Series(column, dtype='float64')
+            else:
+                frame[name] = column
+        return pd.DataFrame(frame, columns=list(values))
 
     def get_stats(self) -> dict:
         """Estatísticas gerais do database"""
-        total = self.session.query(Ad).count()
-        active = self.session.query(Ad).filter_by(is_active=True).count()
-        pages = self.session.query(Ad.page_name).distinct().count()
+        with self.session_scope() as session:
+            total = session.query(Ad).count()
+            active = session.query(Ad).filter_by(is_active=True).count()
+            pages = session.query(Ad.page_name).distinct().count()
+            creatives = session.query(Creative).count()
 
         return {
             'total_ads': total,
             'active_ads': active,
             'unique_pages': pages,
+            'unique_creatives': creatives,
             'inactive_ads': total - active
         }
@@ -0,0 +1,310 @@
+# storage/parquet_archive.py
+import json
+import os
+import shutil
+import sqlite3
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import Boolean, DateTime, Integer
+
+from src.config import Config
+from src.storage.database import Ad, AdDatabase
+
+# Colunas de partição (hive: collected_date=2024-05-01/search_keyword=.../)
+PARTITION_COLUMNS = ['collected_date', 'search_keyword']
+
+
+def _arrow_type(column_type) -> pa.DataType:
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    return pa.string()
+
+
+# Schema do arquivo: colunas da tabela ads + data da coleta (partição)
+ADS_SCHEMA = pa.schema(
+    [(column.name, _arrow_type(column.type)) for column in Ad.__table__.columns]
+    + [('collected_date', pa.string())]
+)
+
+RESPONSES_SCHEMA = pa.schema([
+    ('url', pa.string()),
+    ('body', pa.string()),  # JSON da resposta (descomprimido; o Parquet comprime)
+    ('created_at', pa.timestamp('us')),
+    ('created_date', pa.string()),
+    ('search_terms', pa.string()),
+])
+
+
+class ParquetArchive:
+    """
+    Arquivo Parquet do corpus de ads, particionado por data de coleta e keyword
+
+    Layout: <root>/ads/collected_date=YYYY-MM-DD/search_keyword=<kw>/part-N.parquet
+    (e <root>/responses/... para as respostas brutas do ResponseCache).
+
+    Leituras filtram por partição sem abrir os arquivos das outras datas e
+    keywords, e só leem as colunas pedidas. É a fonte indicada para
+    análises sobre meses de dados; o SQLite segue como fonte da verdade.
+    """
+
+    SYNC_STATE_FILE = '_sync.json'
+
+    def __init__(self, root: str = None, compression: str = None):
+        self.root = root or Config.PARQUET_ARCHIVE_PATH
+        self.compression = compression or Config.PARQUET_COMPRESSION
+
+    @property
+    def ads_path(self) -> str:
+        return os.path.join(self.root, 'ads')
+
+    @property
+    def responses_path(self) -> str:
+        return os.path.join(self.root, 'responses')
+
+    # Escrita
+
+    def export(self, db: AdDatabase, chunk_size: int = None) -> int:
+        """
+        Exportar a tabela ads inteira (substitui o arquivo atual)
+
+        Grava num diretório temporário e troca no fim (ver _swap): leitores
+        nunca veem um arquivo pela metade.
+        """
+        started = datetime.now()
+        tmp_path = self.ads_path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        rows = self._write_ads(db.iter_chunks(chunk_size=chunk_size), tmp_path)
+
+        self._swap(tmp_path, self.ads_path)
+        self._save_state({'last_sync': started.isoformat()})
+        return rows
+
+    def sync(self, db: AdDatabase, chunk_size: int = None) -> int:
+        """
+        Exportar só as datas de coleta desde o último sync
+
+        As partições dessas datas são regravadas inteiras. Mudanças de
+        status de ads coletados em datas anteriores só entram no próximo
+        export completo. Sem sync anterior, faz o export completo.
+        """
+        state = self._load_state()
+        if not state.get('last_sync') or not os.path.isdir(self.ads_path):
+            return self.export(db, chunk_size)
+
+        started = datetime.now()
+        since = datetime.fromisoformat(state['last_sync']).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        rows = self._write_ads(
+            db.iter_chunks(filter=Ad.collected_at >= since, chunk_size=chunk_size),
+            self.ads_path,
+            existing_data_behavior='delete_matching'
+        )
+        self._save_state({'last_sync': started.isoformat()})
+        return rows
+
+    def export_responses(self, cache_path: str = None, chunk_size: int = 1000) -> int:
+        """
+        Exportar as respostas brutas do ResponseCache (por data e termo de busca)
+
+        Substitui o export anterior. Respostas sem search_terms (busca por
+        página, batch) ficam na partição padrão.
+        """
+        cache_path = cache_path or Config.RESPONSE_CACHE_PATH
+        if not cache_path or not os.path.exists(cache_path):
+            return 0
+
+        def batches():
+            conn = sqlite3.connect(cache_path, timeout=30)
+            try:
+                cursor = conn.execute('SELECT url, body, created_at FROM responses ORDER BY created_at')
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield self._responses_batch(rows)
+            finally:
+                conn.close()
+
+        tmp_path = self.responses_path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        total = 0
+
+        def counted():
+            nonlocal total
+            for batch in batches():
+                total += batch.num_rows
+                yield batch
+
+        self._write(counted(), RESPONSES_SCHEMA, tmp_path, ['created_date', 'search_terms'])
+
+        self._swap(tmp_path, self.responses_path)
+        return total
+
+    @staticmethod
+    def _swap(new_path: str, path: str):
+        """
+        Trocar `path` pelo diretório novo
+
+        O antigo é renomeado para o lado antes do os.replace e só apagado
+        depois: `path` fica ausente apenas entre dois renames, nunca
+        durante a remoção dos arquivos.
+        """
+        old_path = path + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.isdir(path):
+            os.replace(path, old_path)
+        os.replace(new_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def _write_ads(self, chunks: Iterator[pd.DataFrame], path: str, existing_data_behavior: str = 'error') -> int:
+        total = 0
+
+        def batches():
+            nonlocal total
+            for chunk in chunks:
+                chunk['collected_date'] = chunk['collected_at'].dt.strftime('%Y-%m-%d')
+                total += len(chunk)
+                yield pa.RecordBatch.from_pandas(chunk, schema=ADS_SCHEMA, preserve_index=False)
+
+        self._write(batches(), ADS_SCHEMA, path, PARTITION_COLUMNS, existing_data_behavior)
+        return total
+
+    def _write(self, batches, schema: pa.Schema, path: str, partitions: List[str], existing_data_behavior: str = 'error'):
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            batches,
+            path,
+            schema=schema,
+            format=file_format,
+            file_options=file_format.make_write_options(compression=self.compression),
+            partitioning=ds.partitioning(pa.schema([schema.field(name) for name in partitions]), flavor='hive'),
+            basename_template='part-{i}.parquet',
+            existing_data_behavior=existing_data_behavior
+        )
+
+    @staticmethod
+    def _responses_batch(rows: list) -> pa.RecordBatch:
+        urls, bodies, created = [], [], []
+        for url, body, created_at in rows:
+            urls.append(url)
+            bodies.append(zlib.decompress(body).decode('utf-8'))
+            created.append(datetime.fromtimestamp(created_at))
+
+        return pa.RecordBatch.from_pydict({
+            'url': urls,
+            'body': bodies,
+            'created_at': created,
+            'created_date': [value.strftime('%Y-%m-%d') for value in created],
+            'search_terms': [dict(parse_qsl(urlsplit(url).query)).get('search_terms') for url in urls],
+        }, schema=RESPONSES_SCHEMA)
+
+    # Leitura
+
+    def dataset(self) -> ds.Dataset:
+        """Dataset Arrow dos ads (partições hive)"""
+        return ds.dataset(
+            self.ads_path,
+            schema=ADS_SCHEMA,
+            format='parquet',
+            partitioning=ds.partitioning(
+                pa.schema([ADS_SCHEMA.field(name) for name in PARTITION_COLUMNS]), flavor='hive'
+            )
+        )
+
+    def read_table(
+        self,
+        columns: List[str] = None,
+        keywords: List[str] = None,
+        since: datetime = None,
+        until: datetime = None,
+        filter: ds.Expression = None
+    ) -> pa.Table:
+        """
+        Ads do arquivo como tabela Arrow
+
+        Args:
+            columns: Projeção (padrão: todas as colunas de Ad)
+            keywords: Só estas keywords (poda de partição)
+            since / until: Datas de coleta, inclusive (poda de partição)
+            filter: Expressão extra do pyarrow.dataset (ex.: ds.field('is_active'))
+        """
+        if not os.path.isdir(self.ads_path):
+            return pa.schema([ADS_SCHEMA.field(name) for name in self._columns(columns)]).empty_table()
+
+        return self.dataset().to_table(
+            columns=self._columns(columns),
+            filter=self._filter(keywords, since, until, filter)
+        )
+
+    def read(self, columns: List[str] = None, **filters) -> pd.DataFrame:
+        """Ads do arquivo como DataFrame (mesmos filtros de read_table)"""
+        return self.read_table(columns, **filters).to_pandas()
+
+    def iter_batches(self, columns: List[str] = None, batch_size: int = None, **filters) -> Iterator[pd.DataFrame]:
+        """Ads do arquivo em DataFrames de até batch_size linhas (ver AdDatabase.iter_chunks)"""
+        if not os.path.isdir(self.ads_path):
+            return
+
+        batches = self.dataset().to_batches(
+            columns=self._columns(columns),
+            filter=self._filter(**filters),
+            batch_size=batch_size or AdDatabase.READ_BATCH_SIZE
+        )
+        for batch in batches:
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    @staticmethod
+    def _columns(columns: Optional[List[str]]) -> List[str]:
+        names = columns or [column.name for column in Ad.__table__.columns]
+        unknown = [name for name in names if name not in ADS_SCHEMA.names]
+        if unknown:
+            raise ValueError(f"Colunas inexistentes em ads: {', '.join(unknown)}")
+        return names
+
+    @staticmethod
+    def _filter(keywords: List[str] = None, since: datetime = None, until: datetime = None, filter: ds.Expression = None):
+        expressions = []
+        if keywords:
+            expressions.append(ds.field('search_keyword').isin(keywords))
+        if since:
+            expressions.append(ds.field('collected_date') >= since.strftime('%Y-%m-%d'))
+        if until:
+            expressions.append(ds.field('collected_date') <= until.strftime('%Y-%m-%d'))
+        if filter is not None:
+            expressions.append(filter)
+
+        if not expressions:
+            return None
+
+        combined = expressions[0]
+        for expression in expressions[1:]:
+            combined = combined & expression
+        return combined
+
+    # Estado do sync
+
+    def _load_state(self) -> dict:
+        try:
+            with open(os.path.join(self.root, self.SYNC_STATE_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, self.SYNC_STATE_FILE), 'w', encoding='utf-8') as f:
+            json.dump(state, f)
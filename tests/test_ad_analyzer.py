@@ -0,0 +1,58 @@
+# tests/test_ad_analyzer.py
+import pandas as pd
+from src.analyzers.ad_analyzer import AdAnalyzer, ChunkedAdAnalyzer
+
+
+def _full_chunk():
+    return pd.DataFrame({
+        'ad_id': ['1', '2', '3'],
+        'page_name': ['A', 'A', 'B'],
+        'days_active': [40, 10, 35],
+        'is_active': [True, False, True],
+        'body': ['learn more today', 'shop now', 'sign up free'],
+        'headline': ['h1', None, 'h3'],
+        'full_text': ['learn more today', 'shop now', 'sign up free'],
+        'text_length': [16, 8, 12],
+        'has_emoji': [False, False, True],
+        'has_hashtags': [False, True, False],
+        'cta_detected': ['learn more', 'shop now', 'sign up'],
+    })
+
+
+def _partial_chunk():
+    # Registros de um perfil parcial: sem texto nem longevidade
+    return pd.DataFrame({
+        'ad_id': ['4', '5'],
+        'page_name': ['A', 'C'],
+        'days_active': pd.Series([None, None], dtype=object),
+        'is_active': [True, True],
+        'body': [None, None],
+        'headline': [None, None],
+        'full_text': [None, None],
+        'text_length': pd.Series([None, None], dtype=object),
+        'has_emoji': pd.Series([None, None], dtype=object),
+        'has_hashtags': pd.Series([None, None], dtype=object),
+        'cta_detected': [None, None],
+    })
+
+
+def test_chunked_analyzer_accepts_chunk_of_partial_rows():
+    analyzer = ChunkedAdAnalyzer([_partial_chunk()])
+
+    assert analyzer.total_ads == 2
+    assert len(analyzer.get_top_performers()) == 0
+    assert analyzer.get_successful_patterns() == {}
+    assert 'Total de 2 ads coletados' in analyzer.get_insights_summary()
+
+
+def test_chunked_analyzer_with_partial_chunk_matches_full_frame():
+    chunks = [_full_chunk(), _partial_chunk()]
+    chunked = ChunkedAdAnalyzer(chunks)
+    full = AdAnalyzer(pd.concat([chunks[0], chunks[1].astype({'days_active': 'float64', 'text_length': 'float64'})]))
+
+    assert chunked.total_ads == full.total_ads
+    assert chunked.get_top_performers()['days_active'].tolist() == [40, 35]
+    assert chunked.analyze_text_patterns() == full.analyze_text_patterns()
+    pd.testing.assert_frame_equal(
+        chunked.analyze_by_page(), full.analyze_by_page(), check_dtype=False, check_like=True
+    )
@@ -0,0 +1,86 @@
+# tests/test_ad_parser.py
+from datetime import datetime
+import pandas as pd
+import pytest
+from src.collectors.meta_api_collector import resolve_fields
+from src.processors.ad_parser import AdParser
+
+AS_OF = datetime(2024, 6, 1, 12)
+
+ADS = [
+    {
+        'id': '1',
+        'page_name': 'OpusClip',
+        'page_id': '10',
+        'ad_delivery_start_time': '2024-01-15',
+        'ad_delivery_stop_time': '2024-03-01',
+        'platforms': ['instagram', 'facebook'],
+        'ad_snapshot_url': 'https://example.com/1',
+        'ad_creative_bodies': ['Edit videos 10x faster with AI 🚀 #ai #video @creators'],
+        'ad_creative_link_titles': ['Learn more'],
+        'ad_creative_link_descriptions': ['Try free today'],
+        'ad_creative_link_captions': ['opus.pro'],
+    },
+    # Campos ausentes: sem datas, sem texto, sem plataformas
+    {'id': '2'},
+    # Corpos vazios e listas vazias
+    {
+        'id': '3',
+        'ad_delivery_start_time': '2024-05-01T10:00:00+0000',
+        'ad_creative_bodies': [''],
+        'ad_creative_link_titles': [],
+        'ad_creative_link_descriptions': None,
+    },
+    # CTAs em outros idiomas, com emoji
+    {
+        'id': '4',
+        'ad_delivery_start_time': '2024-04-20T23:30:00-03:00',
+        'ad_creative_bodies': ['Crie vídeos virais sem esforço 😍 Saiba mais'],
+        'ad_creative_link_titles': ['Compre agora'],
+    },
+    {
+        'id': '5',
+        'ad_delivery_start_time': '2024-02-10',
+        'ad_creative_bodies': ['Edita tus videos con IA. Más información en nuestra web'],
+        'ad_creative_link_titles': ['Regístrate'],
+    },
+    # Mesmo criativo de outro ad (caminho colunar calcula uma vez)
+    {
+        'id': '6',
+        'ad_delivery_start_time': '2024-01-15',
+        'ad_creative_bodies': ['Edit videos 10x faster with AI 🚀 #ai #video @creators'],
+        'ad_creative_link_titles': ['Learn more'],
+        'ad_creative_link_descriptions': ['Try free today'],
+        'ad_creative_link_captions': ['opus.pro'],
+    },
+    # Data inválida
+    {'id': '7', 'ad_delivery_start_time': 'not a date', 'ad_creative_bodies': ['Sign up now']},
+]
+
+
+def per_row(parser, ads, fields=None):
+    """Resultado de referência: parse_ad ad a ad (mesmos dtypes)"""
+    return parser._numeric(pd.DataFrame([parser.parse_ad(ad, fields, AS_OF) for ad in ads]))
+
+
+@pytest.mark.parametrize('fields', [None, resolve_fields(field_profile='monitor')])
+def test_columnar_batch_matches_parse_ad(fields):
+    parser = AdParser()
+
+    pd.testing.assert_frame_equal(parser.parse_batch(ADS, fields=fields, as_of=AS_OF), per_row(parser, ADS, fields))
+
+
+@pytest.mark.parametrize('ads', [ADS[1:2], ADS[2:3], [{'id': '8', 'ad_creative_bodies': ['']}]])
+def test_columnar_batch_matches_parse_ad_without_data(ads):
+    parser = AdParser()
+
+    pd.testing.assert_frame_equal(parser.parse_batch(ads, as_of=AS_OF), per_row(parser, ads))
+
+
+def test_multilingual_ctas_and_emoji():
+    parsed = AdParser().parse_batch(ADS, as_of=AS_OF).set_index('ad_id')
+
+    assert parsed.loc['4', 'cta_detected'] == 'saiba mais'
+    assert parsed.loc['5', 'cta_detected'] == 'más información'
+    assert bool(parsed.loc['4', 'has_emoji']) and not bool(parsed.loc['5', 'has_emoji'])
+    assert parsed.loc['1', 'hashtags'] == ['#ai', '#video']
@@ -0,0 +1,43 @@
+# tests/test_database.py
+from datetime import datetime
+import pandas as pd
+from src.processors.ad_parser import AdParser
+from src.storage.database import AdDatabase
+
+AS_OF = datetime(2024, 6, 1)
+
+
+def raw_ad(i, **extra):
+    return {
+        'id': str(i),
+        'page_name': f'Page {i}',
+        'page_id': str(100 + i),
+        'ad_delivery_start_time': '2024-01-01',
+        'ad_creative_bodies': [f'Body {i}. Learn more'],
+        **extra
+    }
+
+
+def test_save_ads_reingests_overlapping_batch(tmp_path):
+    db = AdDatabase(str(tmp_path / 'ads.db'))
+    parser = AdParser()
+    first = db.save_ads(parser.parse_batch([raw_ad(i) for i in range(1, 5)], as_of=AS_OF), 'video ai')
+    assert first == {'inserted': 4, 'updated': 0, 'unchanged': 0}
+
+    # 3 parou de rodar; 4 vem de um perfil parcial (só id e status); 5 e 6 são novos
+    stopped = parser.parse_batch([raw_ad(3, ad_delivery_stop_time='2024-03-01')], as_of=AS_OF)
+    partial = parser.parse_batch([raw_ad(4)], fields=['id', 'ad_delivery_stop_time'], as_of=AS_OF)
+    new = parser.parse_batch([raw_ad(5), raw_ad(6)], as_of=AS_OF)
+    assert partial['page_name'].isna().all() and partial['start_date'].isna().all()
+
+    counts = db.save_ads(pd.concat([stopped, partial, new], ignore_index=True), 'video ai')
+
+    assert counts == {'inserted': 2, 'updated': 1, 'unchanged': 1}
+    stored = db.get_all().set_index('ad_id')
+    assert len(stored) == 6
+    assert not stored.loc['3', 'is_active']
+    assert stored.loc['3', 'end_date'] == datetime(2024, 3, 1)
+    assert stored.loc['4', 'page_name'] == 'Page 4'
+    assert stored.loc['4', 'start_date'] == datetime(2024, 1, 1)
+    assert stored.loc['4', 'body'] == 'Body 4. Learn more'
+    assert stored.loc['4', 'days_active'] == 152
@@ -0,0 +1,100 @@
+# tests/test_duckdb_engine.py
+import sqlite3
+from datetime import datetime
+import pandas as pd
+import pytest
+from src.analyzers.ad_analyzer import AdAnalyzer
+from src.analyzers.advanced_analytics import AdvancedAnalyzer
+from src.processors.ad_parser import AdParser
+from src.storage.database import AdDatabase
+
+duckdb = pytest.importorskip('duckdb')
+from src.analyzers.duckdb_engine import DuckDBAdAnalyzer, DuckDBEngine, _sql_literal, _sqlite_view  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    # Aspas no caminho: o ATTACH precisa escapar o literal
+    db = AdDatabase(str(tmp_path / "o'brien ads.db"))
+    ads = [
+        {
+            'id': str(i),
+            'page_name': f'Page {i % 3}',
+            'ad_delivery_start_time': f'2024-0{1 + i % 4}-01',
+            'ad_delivery_stop_time': '2024-05-01' if i % 5 == 0 else None,
+            'ad_creative_bodies': [['Learn more about video AI', 'Shop now 😀 #ai', 'Sign up free'][i % 3]],
+            'ad_creative_link_titles': [f'Headline {i % 4}'],
+        }
+        for i in range(30)
+    ]
+    db.save_ads(AdParser().parse_batch(ads, as_of=datetime(2024, 6, 1)), 'video ai')
+    return db
+
+
+def _sqlite_copy(db) -> DuckDBEngine:
+    """Engine com a view do SQLite sobre cópias das tabelas (sem a extensão sqlite)"""
+    connection = duckdb.connect()
+    connection.execute("ATTACH ':memory:' AS store")
+    source = sqlite3.connect(db.db_path)
+    for table in ('ads', 'creatives'):
+        connection.register('source', pd.read_sql(f'SELECT * FROM {table}', source))
+        connection.execute(f'CREATE TABLE store.{table} AS SELECT * FROM source')
+        connection.unregister('source')
+    source.close()
+    connection.execute(_sqlite_view())
+    return DuckDBEngine(connection)
+
+
+def _assert_same_results(duck: DuckDBAdAnalyzer, pandas: AdAnalyzer):
+    assert duck.total_ads == pandas.total_ads
+    assert duck.analyze_text_patterns() == pytest.approx(pandas.analyze_text_patterns())
+    # Empates saem em outra ordem: comparar o conjunto inteiro
+    assert dict(duck.get_most_common_words(100)) == dict(pandas.get_most_common_words(100))
+    assert duck.analyze_cta_distribution().to_dict() == pandas.analyze_cta_distribution().to_dict()
+    assert duck.get_successful_patterns() == pandas.get_successful_patterns()
+    pd.testing.assert_frame_equal(duck.analyze_by_page().sort_index(), pandas.analyze_by_page().sort_index())
+    pd.testing.assert_frame_equal(
+        duck.compare_competitors(['Page 0', 'Page 2']).sort_values('page').reset_index(drop=True),
+        pandas.compare_competitors(['Page 0', 'Page 2']).sort_values('page').reset_index(drop=True),
+    )
+
+
+def test_sqlite_view_matches_pandas(db):
+    with DuckDBAdAnalyzer(_sqlite_copy(db)) as duck:
+        _assert_same_results(duck, AdAnalyzer(db.get_all()))
+        pd.testing.assert_frame_equal(
+            AdvancedAnalyzer(duck.engine).analyze_trends_over_time(),
+            AdvancedAnalyzer().analyze_trends_over_time(db.get_all()),
+            check_freq=False,
+        )
+
+
+def test_sqlite_attach(db):
+    try:
+        analyzer = DuckDBAdAnalyzer.from_sqlite(db.db_path)
+    except RuntimeError as e:
+        pytest.skip(f'extensão sqlite do DuckDB indisponível: {e}')
+
+    with analyzer:
+        _assert_same_results(analyzer, AdAnalyzer(db.get_all()))
+    with pytest.raises(duckdb.ConnectionException):
+        analyzer.total_ads
+
+
+def test_attach_path_with_quote(tmp_path):
+    path = str(tmp_path / "it's.duckdb")
+    with DuckDBEngine(duckdb.connect()) as engine:
+        engine.connection.execute(f'ATTACH {_sql_literal(path)} AS store')
+        assert engine.scalar('SELECT 1') == 1
+
+
+def test_report_with_duckdb_engine_falls_back(db, tmp_path, monkeypatch):
+    from src.config import Config
+    from src.main import AdIntelligencePipeline
+
+    monkeypatch.setattr(Config, 'ANALYTICS_ENGINE', 'duckdb')
+    pipeline = AdIntelligencePipeline(api=object(), db=db)
+    output = tmp_path / 'report.txt'
+    pipeline.generate_report(str(output))
+
+    assert 'Total de 30 ads coletados' in output.read_text(encoding='utf-8')
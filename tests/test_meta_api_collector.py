@@ -0,0 +1,182 @@
+# tests/test_meta_api_collector.py
+import json
+import time
+import pytest
+from src.collectors.checkpoint import CheckpointStore
+from src.collectors.meta_api_collector import MetaAdLibraryAPI
+from src.collectors.token_pool import TokenPool
+from src.config import Config
+from tools.mock_ad_library_server import MockAdLibraryServer
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeBatchSession:
+    """Responde chamadas batch com sub-respostas roteirizadas por página"""
+
+    def __init__(self, script):
+        self.script = script  # page_id -> lista de (code, body) por chamada
+        self.tokens = []
+
+    def request(self, method, url, timeout=None, params=None, data=None):
+        self.tokens.append(data['access_token'])
+        responses = []
+        for item in json.loads(data['batch']):
+            page_id = item['relative_url'].split('/')[0]
+            code, body = self.script[page_id].pop(0)
+            responses.append({'code': code, 'body': body})
+        return FakeResponse(responses)
+
+
+def _ads(page_id):
+    return json.dumps({'data': [{'id': f'{page_id}-1'}]})
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """Sem estado em disco e sem espera entre retries"""
+    monkeypatch.setattr(Config, 'CHECKPOINT_PATH', None)
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE_PATH', None)
+    monkeypatch.setattr(Config, 'RATE_LIMIT_STATE_PATH', None)
+    monkeypatch.setattr(Config, 'API_RETRY_DELAY', 0)
+
+
+@pytest.fixture
+def api(config):
+    return MetaAdLibraryAPI(access_tokens=['token-a', 'token-b'])
+
+
+def test_batch_retries_unparseable_and_throttled_pages(api):
+    throttled = json.dumps({'error': {'code': 4, 'message': 'rate limit'}})
+    api.session = FakeBatchSession({
+        '1': [(200, 'not json'), (200, _ads('1'))],
+        '2': [(400, throttled), (200, _ads('2'))],
+        '3': [(200, _ads('3'))],
+    })
+
+    results = api.get_ads_by_pages(['1', '2', '3'])
+
+    assert {page: [ad['id'] for ad in ads] for page, ads in results.items()} == {
+        '1': ['1-1'], '2': ['2-1'], '3': ['3-1']
+    }
+    # O token em rate limit saiu da vez: o retry foi com o outro
+    assert api.session.tokens[0] != api.session.tokens[1]
+
+
+def test_batch_drops_only_the_failing_page(api):
+    api.session = FakeBatchSession({
+        '1': [(404, json.dumps({'error': {'code': 100}}))],
+        '2': [(200, _ads('2'))],
+    })
+
+    results = api.get_ads_by_pages(['1', '2'])
+
+    assert results == {'1': [], '2': [{'id': '2-1'}]}
+
+
+def mock_server(**state_kwargs):
+    """Mock da Ad Library sem latência"""
+    return MockAdLibraryServer(latency_ms=0, jitter_ms=0, **state_kwargs)
+
+
+def test_batch_throttled_sub_responses_do_not_block_the_token(api, monkeypatch):
+    monkeypatch.setattr(Config, 'API_RETRY_ATTEMPTS', 10)
+    page_ids = [str(1000 + i) for i in range(20)]
+
+    with mock_server(ads_per_query=10, throttle_rate=0.3) as server:
+        api.base_url = server.base_url
+        results = api.get_ads_by_pages(page_ids, limit=10)
+        stats = server.stats()
+
+    assert stats['throttled'] > 0
+    assert all(len(results[page_id]) == 10 for page_id in page_ids)
+    # 429 por página é só retry com backoff: nenhum token parado por BLOCK_SECONDS
+    assert all(t.usable(time.time()) for t in api.tokens.tokens)
+
+
+def test_expired_token_fails_over_to_the_next(api):
+    with mock_server(ads_per_query=10, expired_tokens=('token-a',)) as server:
+        api.base_url = server.base_url
+        ads = api.search_ads('video ai', limit=10)
+        stats = server.stats()
+
+    expired, fallback = api.tokens.tokens
+    assert len(ads) == 10
+    assert stats['auth_errors'] == 1
+    assert expired.expired and not fallback.expired
+    assert fallback.requests == 1
+
+
+def test_request_goes_to_the_token_with_most_budget(api):
+    spent, fresh = api.tokens.tokens
+    spent.limiter.wait_if_needed(50)
+
+    with mock_server(ads_per_query=10) as server:
+        api.base_url = server.base_url
+        api.search_ads('video ai', limit=10)
+
+    assert (spent.requests, fresh.requests) == (0, 1)
+
+
+def test_consecutive_failures_block_the_token(config, monkeypatch):
+    monkeypatch.setattr(Config, 'API_RETRY_ATTEMPTS', TokenPool.MAX_CONSECUTIVE_FAILURES)
+    monkeypatch.setattr(TokenPool, 'BLOCK_SECONDS', 0.2)
+    api = MetaAdLibraryAPI(access_tokens=['token'])
+    token = api.tokens.tokens[0]
+
+    with mock_server(error_rate=1.0) as server:
+        api.base_url = server.base_url
+        started = time.time()
+        assert api.search_ads('video ai', limit=10) == []
+        stats = server.stats()
+
+    # 5 falhas seguidas bloqueiam o token; a última tentativa espera o bloqueio
+    assert token.blocked_until > started
+    assert time.time() - started >= TokenPool.BLOCK_SECONDS
+    assert stats['server_errors'] == TokenPool.MAX_CONSECUTIVE_FAILURES + 1
+
+
+def test_usage_headers_throttle_the_token_limiter(config):
+    api = MetaAdLibraryAPI(access_tokens=['token'])
+
+    with mock_server(ads_per_query=10, quota_per_hour=4) as server:
+        api.base_url = server.base_url
+        for _ in range(3):
+            api.search_ads('video ai', limit=10)
+
+    # 75% da quota usada: orçamento limitado ao que sobra e taxa reduzida
+    limiter = api.tokens.tokens[0].limiter
+    state = limiter._load()
+    assert limiter.available() <= Config.API_RATE_LIMIT * 0.25 + 1
+    assert state['usage_factor'] < 1.0
+
+
+def test_checkpoint_resumes_after_an_interrupted_collection(api, tmp_path):
+    api.checkpoints = CheckpointStore(str(tmp_path / 'checkpoints.db'))
+
+    with mock_server(ads_per_query=250) as server:
+        api.base_url = server.base_url
+
+        pages = api.search_ads_iter('video ai', limit=250)
+        first = next(pages)
+        pages.close()  # coleta interrompida depois da primeira página
+
+        resumed = list(api.search_ads_iter('video ai', limit=250))
+        stats = server.stats()
+
+    assert [page.ads for page in resumed][0] == first.ads
+    assert sum(len(page.ads) for page in resumed) == 250
+    assert len({ad['id'] for page in resumed for ad in page.ads}) == 250
+    assert stats['requests'] == 3  # a primeira página não foi pedida de novo
@@ -0,0 +1,26 @@
+# tests/test_parquet_archive.py
+import os
+from datetime import datetime
+from src.processors.ad_parser import AdParser
+from src.storage.database import AdDatabase
+from src.storage.parquet_archive import ParquetArchive
+
+
+def _save(db, ids, keyword):
+    ads = [{'id': str(i), 'page_name': 'P', 'ad_delivery_start_time': '2024-01-01',
+            'ad_creative_bodies': [f'body {i}']} for i in ids]
+    db.save_ads(AdParser().parse_batch(ads, as_of=datetime(2024, 6, 1)), keyword)
+
+
+def test_export_replaces_archive_without_leftovers(tmp_path):
+    db = AdDatabase(str(tmp_path / 'ads.db'))
+    archive = ParquetArchive(str(tmp_path / 'archive'))
+
+    _save(db, range(3), 'kw')
+    assert archive.export(db) == 3
+
+    _save(db, range(3, 5), 'kw')
+    assert archive.export(db) == 5
+
+    assert sorted(archive.read(columns=['ad_id'])['ad_id']) == ['0', '1', '2', '3', '4']
+    assert sorted(os.listdir(archive.root)) == ['_sync.json', 'ads']
@@ -0,0 +1,113 @@
+# tests/test_pipeline.py
+from datetime import datetime
+from src.collectors.meta_api_collector import AdPage, resolve_fields
+from src.main import AdIntelligencePipeline
+from src.storage.database import Ad, AdDatabase
+
+RAW_ADS = [
+    {
+        'id': str(i),
+        'page_name': f'Page {i % 3}',
+        'page_id': str(100 + i % 3),
+        'ad_delivery_start_time': f'2024-0{1 + i % 5}-01',
+        'ad_creative_link_titles': [f'Headline {i}'],
+    }
+    for i in range(12)
+]
+
+
+class FakeAPI:
+    """Devolve sempre as mesmas páginas, só com os campos pedidos"""
+
+    def __init__(self, ads):
+        self.ads = ads
+        self.pages = {}  # keyword -> páginas entregues
+
+    def search_ads_iter(self, search_terms, fields=None, stop_when_known=None, **kwargs):
+        ads = [{key: value for key, value in ad.items() if fields is None or key in fields} for ad in self.ads]
+        for page_no, page in enumerate([ads[:6], ads[6:]], start=1):
+            self.pages[search_terms] = page_no
+            # Como _iter_pages: checar antes de entregar a página
+            if stop_when_known is not None and stop_when_known([ad['id'] for ad in page]):
+                yield AdPage(page, None, page_no)
+                return
+            yield AdPage(page, 'next' if page_no == 1 else None, page_no)
+
+
+def test_monitor_profile_runs_end_to_end(tmp_path):
+    db = AdDatabase(str(tmp_path / 'ads.db'))
+    pipeline = AdIntelligencePipeline(api=FakeAPI(RAW_ADS), db=db)
+
+    results = pipeline.collect_and_analyze(
+        ['video ai', 'ai tools'], field_profile='monitor', as_of=datetime(2024, 6, 1)
+    )
+
+    assert set(results) == {'video ai', 'ai tools'}
+    for result in results.values():
+        assert result['total_ads'] == 12
+        assert 'Total de 12 ads coletados' in result['insights']
+        assert len(result['top_performers']) == 0  # sem stop_time não há longevidade
+
+    stored = db.get_all()
+    assert len(stored) == 12
+    assert stored['days_active'].isna().all()
+    assert stored['headline'].notna().all()
+
+
+def test_monitor_profile_report(tmp_path):
+    db = AdDatabase(str(tmp_path / 'ads.db'))
+    pipeline = AdIntelligencePipeline(api=FakeAPI(RAW_ADS), db=db)
+    pipeline.collect_and_analyze(['video ai'], field_profile='monitor', as_of=datetime(2024, 6, 1))
+
+    output = tmp_path / 'report.txt'
+    pipeline.generate_report(str(output))
+
+    assert 'Total de 12 ads coletados' in output.read_text(encoding='utf-8')
+
+
+def test_monitor_repoll_keeps_creatives_deduplicated(tmp_path):
+    db = AdDatabase(str(tmp_path / 'ads.db'))
+    pipeline = AdIntelligencePipeline(api=FakeAPI(RAW_ADS), db=db)
+    full = pipeline.parser.parse_batch(RAW_ADS, as_of=datetime(2024, 6, 1))
+    db.save_ads(full, 'video ai')
+
+    monitor = pipeline.parser.parse_batch(
+        RAW_ADS, fields=resolve_fields(field_profile='monitor'), as_of=datetime(2024, 6, 1)
+    )
+    counts = db.save_ads(monitor, 'video ai')
+
+    assert counts == {'inserted': 0, 'updated': 0, 'unchanged': 12}
+    with db.session_scope() as session:
+        inline = session.query(Ad).filter(Ad.headline.isnot(None)).count()
+    assert inline == 0
+    assert db.get_all()['headline'].notna().all()
+
+
+def test_default_as_of_matches_utc_dates():
+    from datetime import timedelta, timezone
+    from src.processors.ad_parser import AdParser, utc_now
+
+    start = (datetime.now(timezone.utc) - timedelta(days=10, hours=1)).replace(microsecond=0)
+    ad = {'id': '1', 'ad_delivery_start_time': start.isoformat()}
+
+    parsed = AdParser().parse_batch([ad])
+    assert parsed['days_active'].iloc[0] == 10
+    assert AdParser().parse_ad(ad)['days_active'] == 10
+    assert abs((utc_now() - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()) < 5
+
+
+def test_incremental_stop_ignores_ads_saved_by_other_keywords(tmp_path):
+    db = AdDatabase(str(tmp_path / 'ads.db'))
+    api = FakeAPI(RAW_ADS)
+    pipeline = AdIntelligencePipeline(api=api, db=db)
+    # Só a segunda página já era conhecida antes da execução
+    db.save_ads(pipeline.parser.parse_batch(RAW_ADS[6:], as_of=datetime(2024, 6, 1)), 'old')
+
+    results = pipeline.collect_and_analyze(['video ai', 'ai tools'], incremental=True, as_of=datetime(2024, 6, 1))
+
+    assert api.pages == {'video ai': 2, 'ai tools': 2}
+    assert results['ai tools']['total_ads'] == 12
+
+    # Na execução seguinte a primeira página já é conhecida: para nela
+    pipeline.collect_and_analyze(['ai tools'], incremental=True, as_of=datetime(2024, 6, 1))
+    assert api.pages['ai tools'] == 1
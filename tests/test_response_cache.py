@@ -0,0 +1,56 @@
+# tests/test_response_cache.py
+import time
+from src.collectors.meta_api_collector import MetaAdLibraryAPI
+from src.collectors.response_cache import ResponseCache
+from src.config import Config
+from tools.mock_ad_library_server import MockAdLibraryServer
+
+URL = 'https://graph.facebook.com/v20.0/ads_archive'
+
+
+def test_readwrite_eviction_keeps_recordings(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(path, mode='record').put(URL, {'search_terms': 'video ai'}, {'data': [1]})
+
+    readwrite = ResponseCache(path, ttl_seconds=0, mode='readwrite')
+    time.sleep(0.01)
+    readwrite.put(URL, {'search_terms': 'other'}, {'data': [2]})
+    readwrite.put(URL, {'search_terms': 'video ai'}, {'data': ['fresh']})
+
+    replay = ResponseCache(path, mode='replay')
+    assert replay.get(URL, {'search_terms': 'video ai'}) == {'data': [1]}
+
+
+def test_size_limit_skips_recordings(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(path, mode='record').put(URL, {'q': 'pinned'}, {'data': 'x' * 1000})
+
+    ResponseCache(path, max_bytes=1, mode='readwrite').put(URL, {'q': 'new'}, {'data': 'y'})
+
+    assert ResponseCache(path, mode='replay').get(URL, {'q': 'pinned'}) is not None
+
+
+def test_normalize_escapes_separators_in_values():
+    assert ResponseCache.key(URL, {'a': 'x&b=y'}) != ResponseCache.key(URL, {'a': 'x', 'b': 'y'})
+    assert ResponseCache.key(URL + '?b=2&a=1', {'access_token': 't'}) == ResponseCache.key(URL, {'a': 1, 'b': 2})
+
+
+def test_readwrite_serves_expired_recordings(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'CHECKPOINT_PATH', None)
+    monkeypatch.setattr(Config, 'RATE_LIMIT_STATE_PATH', None)
+    path = str(tmp_path / 'cache.db')
+
+    with MockAdLibraryServer(ads_per_query=10, latency_ms=0, jitter_ms=0) as server:
+        def search(mode):
+            cache = ResponseCache(path, ttl_seconds=0, mode=mode)
+            api = MetaAdLibraryAPI(access_tokens=['token'], response_cache=cache)
+            api.base_url = server.base_url
+            return api.search_ads('video ai', limit=10)
+
+        recorded = search('record')
+        time.sleep(0.01)
+        assert search('readwrite') == recorded
+        assert search('readwrite') == recorded
+        stats = server.stats()
+
+    assert stats['http_requests'] == 1
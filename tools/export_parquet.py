@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Exportar/sincronizar o corpus de ads para o arquivo Parquet
+
+Grava <out>/ads particionado por data de coleta e keyword (zstd). Por
+padrão sincroniza só as datas desde o último sync; --full regrava tudo.
+--responses exporta também as respostas brutas do cache da API.
+
+Uso (a partir da raiz do projeto):
+    python -m tools.export_parquet
+    python -m tools.export_parquet --full --responses --out /mnt/backup/archive
+"""
+import argparse
+import time
+
+from src.config import Config
+from src.storage.database import AdDatabase
+from src.storage.parquet_archive import ParquetArchive
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportar ads para Parquet particionado')
+    parser.add_argument('--db', default=Config.DB_PATH, help='database SQLite de origem')
+    parser.add_argument('--out', default=Config.PARQUET_ARCHIVE_PATH, help='diretório do arquivo Parquet')
+    parser.add_argument('--full', action='store_true', help='regravar o arquivo inteiro')
+    parser.add_argument('--responses', action='store_true', help='exportar também o cache de respostas')
+    parser.add_argument('--cache', default=Config.RESPONSE_CACHE_PATH, help='cache de respostas de origem')
+    parser.add_argument('--compression', default=Config.PARQUET_COMPRESSION)
+    args = parser.parse_args()
+
+    db = AdDatabase(args.db)
+    archive = ParquetArchive(args.out, compression=args.compression)
+
+    start = time.perf_counter()
+    rows = archive.export(db) if args.full else archive.sync(db)
+    print(f"{rows} ads {'exportados' if args.full else 'sincronizados'} em {archive.ads_path} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    if args.responses:
+        start = time.perf_counter()
+        responses = archive.export_responses(args.cache)
+        print(f"{responses} respostas exportadas em {archive.responses_path} "
+              f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Load test do coletor contra o mock local da Ad Library
+
+Sobe tools/mock_ad_library_server.py numa thread (ou usa --url), roda o
+MetaAdLibraryAPI / AsyncMetaAdLibraryAPI / pipeline completo e reporta
+páginas/s, ads/s e eficiência de quota (ads úteis por request cobrada).
+
+Uso (a partir da raiz do projeto):
+    python -m tools.load_test_collector --scenario collector
+    python -m tools.load_test_collector --scenario async --concurrency 8 --error-rate 0.05
+    python -m tools.load_test_collector --scenario pipeline --keywords 6 --limit 300
+    python -m tools.load_test_collector --scenario pages --page-ids 60 --limit 200 --batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+from src.config import Config
+
+KEYWORDS = [
+    'video editing ai', 'ai video editor', 'viral videos', 'content creation tools',
+    'social media tools', 'auto captions', 'short form video', 'reels editor',
+    'editor de video', 'legendas automaticas', 'podcast clips', 'youtube shorts'
+]
+
+
+def configure(args):
+    """Config isolada: sem estado compartilhado, sem cache, retries rápidos"""
+    Config.RATE_LIMIT_STATE_PATH = None
+    Config.CHECKPOINT_PATH = None
+    Config.RESPONSE_CACHE_PATH = None
+    Config.API_RATE_LIMIT = args.rate_limit
+    Config.API_RETRY_DELAY = args.retry_delay
+    Config.API_RETRY_MAX_DELAY = max(args.retry_delay * 8, 1)
+    Config.API_POOL_SIZE = max(Config.API_POOL_SIZE, args.concurrency)
+
+
+def make_api(base_url: str, tokens: list):
+    from src.collectors.meta_api_collector import MetaAdLibraryAPI
+
+    api = MetaAdLibraryAPI(access_tokens=tokens)
+    api.base_url = base_url
+    return api
+
+
+def server_stats(base_url: str) -> dict:
+    root = base_url.rsplit('/', 1)[0]
+    try:
+        return requests.get(f'{root}/__stats', timeout=5).json()
+    except (requests.exceptions.RequestException, ValueError):
+        return {}
+
+
+def run_collector(api, keywords, args) -> dict:
+    pages = ads = 0
+    for keyword in keywords:
+        for page in api.search_ads_iter(keyword, countries=['US'], limit=args.limit):
+            pages += 1
+            ads += len(page.ads)
+    return {'pages': pages, 'ads': ads}
+
+
+def run_async(api, keywords, args) -> dict:
+    from src.collectors.async_collector import AsyncMetaAdLibraryAPI
+
+    collector = AsyncMetaAdLibraryAPI(api, max_concurrency=args.concurrency)
+
+    async def collect():
+        ads = 0
+        async for _, _, job_ads in collector.search_many(keywords, countries=['US'], limit=args.limit):
+            ads += len(job_ads)
+        return ads
+
+    ads = asyncio.run(collect())
+    return {'pages': None, 'ads': ads}
+
+
+def run_pages(api, keywords, args) -> dict:
+    page_ids = [str(1000 + i) for i in range(args.page_ids)]
+
+    if args.batch:
+        results = api.get_ads_by_pages(page_ids, limit=args.limit)
+        ads = sum(len(page_ads) for page_ads in results.values())
+    else:
+        ads = sum(len(api.get_ads_by_page(page_id, limit=args.limit)) for page_id in page_ids)
+
+    return {'pages': None, 'ads': ads}
+
+
+def run_pipeline(api, keywords, args) -> dict:
+    from src.main import AdIntelligencePipeline
+    from src.storage.database import AdDatabase
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AdDatabase(os.path.join(tmp, 'load_test.db'))
+        pipeline = AdIntelligencePipeline(api=api, db=db)
+        results = pipeline.collect_and_analyze(
+            keywords,
+            countries=['US'],
+            limit_per_keyword=args.limit,
+            max_concurrency=args.concurrency
+        )
+        stats = db.get_stats()
+
+    return {
+        'pages': None,
+        'ads': sum(r['total_ads'] for r in results.values()),
+        'stored_ads': stats['total_ads']
+    }
+
+
+SCENARIOS = {
+    'collector': run_collector,
+    'async': run_async,
+    'pages': run_pages,
+    'pipeline': run_pipeline,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test do coletor (mock local)')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='collector')
+    parser.add_argument('--url', help='Base URL de um mock já rodando (ex.: http://127.0.0.1:8765/v20.0)')
+    parser.add_argument('--keywords', type=int, default=4)
+    parser.add_argument('--limit', type=int, default=500, help='ads por keyword')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--rate-limit', type=int, default=1_000_000, help='requests/hora do RateLimiter')
+    parser.add_argument('--retry-delay', type=float, default=0.1)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--quota', type=int, default=1_000_000, help='quota/hora do mock')
+    parser.add_argument('--ads-per-query', type=int, default=1000)
+    parser.add_argument('--tokens', type=int, default=1, help='tamanho do pool de tokens')
+    parser.add_argument('--expired-tokens', type=int, default=0, help='quantos tokens do pool respondem erro 190')
+    parser.add_argument('--page-ids', type=int, default=50, help='páginas no cenário pages')
+    parser.add_argument('--batch', action='store_true', help='cenário pages com requests batch')
+    parser.add_argument('--json', action='store_true', help='imprimir resultado em JSON')
+    args = parser.parse_args()
+
+    configure(args)
+    keywords = (KEYWORDS * (args.keywords // len(KEYWORDS) + 1))[:args.keywords]
+    tokens = [f'load-test-token-{i}' for i in range(max(1, args.tokens))]
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        from tools.mock_ad_library_server import MockAdLibraryServer
+
+        server = MockAdLibraryServer(
+            latency_ms=args.latency_ms,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+            quota_per_hour=args.quota,
+            ads_per_query=args.ads_per_query,
+            expired_tokens=tuple(tokens[:args.expired_tokens])
+        ).start()
+        base_url = server.base_url
+
+    try:
+        api = make_api(base_url, tokens)
+        before = server_stats(base_url)
+
+        start = time.perf_counter()
+        result = SCENARIOS[args.scenario](api, keywords, args)
+        elapsed = time.perf_counter() - start
+
+        after = server_stats(base_url)
+    finally:
+        if server:
+            server.stop()
+
+    requests_made = after.get('requests', 0) - before.get('requests', 0)
+    ok_requests = after.get('ok', 0) - before.get('ok', 0)
+    round_trips = after.get('http_requests', 0) - before.get('http_requests', 0)
+    pages = result['pages'] if result['pages'] is not None else ok_requests
+
+    report = {
+        'scenario': args.scenario,
+        'keywords': len(keywords),
+        'concurrency': args.concurrency,
+        'tokens': len(tokens),
+        'elapsed_s': round(elapsed, 3),
+        'pages': pages,
+        'ads': result['ads'],
+        'pages_per_s': round(pages / elapsed, 2) if elapsed else None,
+        'ads_per_s': round(result['ads'] / elapsed, 2) if elapsed else None,
+        'requests': requests_made,
+        'round_trips': round_trips,
+        'failed_requests': requests_made - ok_requests,
+        # Ads úteis por request cobrada (inclui retries e erros)
+        'ads_per_request': round(result['ads'] / requests_made, 2) if requests_made else None,
+        'quota_efficiency_%': round(100.0 * ok_requests / requests_made, 1) if requests_made else None,
+    }
+    if 'stored_ads' in result:
+        report['stored_ads'] = result['stored_ads']
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print(f"Load test: {args.scenario}")
+    print("=" * 60)
+    for key, value in report.items():
+        print(f"  {key:<20} {value}")
+
+
+if __name__ == '__main__':
+    main()
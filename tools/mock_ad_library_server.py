@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+"""
+Servidor local que imita o endpoint ads_archive da Meta Ad Library
+
+Serve ads sintéticos (determinísticos por busca) com paginação por cursor,
+requests batch (POST com `batch`), latência configurável, injeção de
+429/5xx e headers de uso (x-app-usage / x-business-use-case-usage), para
+testar o coletor sem acessar graph.facebook.com.
+
+Uso:
+    python tools/mock_ad_library_server.py --port 8765 --latency-ms 80 --error-rate 0.02
+    # depois: MetaAdLibraryAPI().base_url = 'http://127.0.0.1:8765/v20.0'
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+BODIES = [
+    "Edit videos 10x faster with AI 🚀 Learn more at our site #ai #video",
+    "Turn long videos into viral clips in seconds. Try free today! @creators",
+    "Saiba mais sobre o editor de vídeo com IA 🎬 #criadores",
+    "Compre agora e ganhe 50% de desconto no plano anual",
+    "The easiest way to add captions to your reels. Sign up now",
+    "Crie vídeos virais sem esforço. Experimente grátis! 😍",
+    "Join now and get access to 1000+ templates #contentcreator",
+    "Stop wasting hours editing. Get started in 2 minutes",
+]
+HEADLINES = [
+    "AI Video Editor", "Viral Clips in Seconds", "Editor de Vídeo com IA",
+    "Auto Captions", "Templates Prontos", "Shop Now", "Book Now", None
+]
+MAX_BATCH_SIZE = 50
+
+PAGES = ['OpusClip', 'Descript', 'Captions.ai', 'StoryShort.ai', 'Kapwing', 'VEED', 'CapCut']
+
+
+class MockAdLibraryState:
+    """Estado compartilhado entre as threads do servidor"""
+
+    def __init__(
+        self,
+        ads_per_query: int = 500,
+        latency_ms: float = 50,
+        jitter_ms: float = 20,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        quota_per_hour: int = 200,
+        seed: int = 42,
+        expired_tokens: tuple = ()
+    ):
+        self.ads_per_query = ads_per_query
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.quota_per_hour = quota_per_hour
+        self.expired_tokens = set(expired_tokens)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}  # token -> deque de timestamps (quota por app)
+        self.stats = {
+            'requests': 0,
+            'ok': 0,
+            'throttled': 0,
+            'server_errors': 0,
+            'ads_served': 0,
+            'auth_errors': 0,
+            'http_requests': 0,
+            'batch_requests': 0
+        }
+
+    def register_call(self, token: str, count: int = 1) -> float:
+        """
+        Registrar chamada(s) e retornar % de uso da quota do token na última hora
+
+        Um batch conta como uma chamada por sub-request, como na Graph API.
+        """
+        now = time.time()
+        with self.lock:
+            calls = self.calls.setdefault(token, deque())
+            calls.extend([now] * count)
+            while calls and now - calls[0] > 3600:
+                calls.popleft()
+            self.stats['requests'] += count
+            self.stats['http_requests'] += 1
+            return 100.0 * len(calls) / self.quota_per_hour
+
+    def roll_failure(self):
+        """None, 429 ou 500 conforme as taxas configuradas"""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def sleep_latency(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000.0)
+
+
+def synthetic_ad(query_key: str, index: int) -> dict:
+    """Ad determinístico para (busca, posição)"""
+    digest = hashlib.sha1(f'{query_key}:{index}'.encode('utf-8')).digest()
+    pick = lambda options, offset: options[digest[offset] % len(options)]
+
+    # ~1/3 dos ids se repetem entre buscas (ads que aparecem em várias keywords)
+    if digest[0] % 3 == 0:
+        ad_id = str(10 ** 14 + int.from_bytes(digest[1:4], 'big') % 5000)
+    else:
+        ad_id = str(2 * 10 ** 14 + int.from_bytes(digest[1:7], 'big'))
+
+    start = datetime(2024, 1, 1) + timedelta(days=int.from_bytes(digest[7:9], 'big') % 600)
+    page_name = pick(PAGES, 9)
+
+    ad = {
+        'id': ad_id,
+        'page_name': page_name,
+        'page_id': str(1000 + PAGES.index(page_name)),
+        'ad_delivery_start_time': start.strftime('%Y-%m-%d'),
+        'ad_snapshot_url': f'https://www.facebook.com/ads/archive/render_ad/?id={ad_id}',
+        'ad_creative_bodies': [pick(BODIES, 10)],
+        'ad_creative_link_captions': ['example.com'],
+        'ad_creative_link_descriptions': ['Free trial available'] if digest[11] % 2 else [],
+        'platforms': ['instagram', 'facebook'] if digest[12] % 2 else ['instagram'],
+        'publisher_platforms': ['instagram'],
+    }
+
+    headline = pick(HEADLINES, 13)
+    if headline:
+        ad['ad_creative_link_titles'] = [headline]
+
+    if digest[14] % 3 == 0:
+        ad['ad_delivery_stop_time'] = (start + timedelta(days=digest[15] % 120 + 1)).strftime('%Y-%m-%d')
+
+    return ad
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return 0
+
+
+def archive_page(state: MockAdLibraryState, path: str, query: dict, base: str, token: str = '') -> dict:
+    """Página de resultados no formato da Graph API"""
+    page_match = re.search(r'/(\d+)/ads_archive$', path)
+    query_key = f"page:{page_match.group(1)}" if page_match else query.get('search_terms', '')
+
+    limit = max(1, min(int(query.get('limit', 25)), 100))
+    offset = decode_cursor(query['after']) if 'after' in query else 0
+    end = min(offset + limit, state.ads_per_query)
+
+    fields = query.get('fields')
+    wanted = set(fields.split(',')) if fields else None
+
+    ads = []
+    for index in range(offset, end):
+        ad = synthetic_ad(query_key, index)
+        if wanted is not None:
+            ad = {k: v for k, v in ad.items() if k in wanted}
+        ads.append(ad)
+
+    result = {'data': ads}
+    if end < state.ads_per_query:
+        next_query = dict(query, access_token=token)  # como a Graph API, token na URL
+        next_query['after'] = encode_cursor(end)
+        result['paging'] = {
+            'cursors': {'after': next_query['after']},
+            'next': f"{base}{path}?{urlencode(next_query)}"
+        }
+
+    state.count('ads_served', len(ads))
+    return result
+
+
+def usage_headers(usage_pct: float) -> dict:
+    pct = int(min(usage_pct, 100))
+    regain = 0 if usage_pct < 100 else 5
+    return {
+        'x-app-usage': json.dumps({'call_count': pct, 'total_cputime': pct // 2, 'total_time': pct // 2}),
+        'x-business-use-case-usage': json.dumps({
+            '0': [{
+                'type': 'ads_archive',
+                'call_count': pct,
+                'total_cputime': pct // 2,
+                'total_time': pct // 2,
+                'estimated_time_to_regain_access': regain
+            }]
+        })
+    }
+
+
+def make_handler(state: MockAdLibraryState):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, como a Graph API
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+
+            if parts.path == '/__stats':
+                with state.lock:
+                    self._send(200, dict(state.stats))
+                return
+
+            if not parts.path.endswith('/ads_archive'):
+                self._send(404, {'error': {'message': 'Unknown path', 'code': 803}})
+                return
+
+            query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            token = query.pop('access_token', '')
+            self._respond(token, lambda: archive_page(state, parts.path, query, self._base_url(), token))
+
+        def do_POST(self):
+            # Batch da Graph API: POST na raiz versionada com `batch` (JSON)
+            parts = urlsplit(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+            token = form.pop('access_token', '')
+
+            try:
+                batch = json.loads(form.get('batch', ''))
+            except ValueError:
+                batch = None
+
+            if not isinstance(batch, list) or not 0 < len(batch) <= MAX_BATCH_SIZE:
+                self._send(400, {'error': {
+                    'message': f'Batch must contain 1 to {MAX_BATCH_SIZE} requests',
+                    'type': 'GraphBatchException',
+                    'code': 100
+                }})
+                return
+
+            state.count('batch_requests')
+            headers = self._admit(token, len(batch))
+            if headers is None:
+                return
+
+            version = parts.path.strip('/')
+            self._send(200, [self._batch_item(item, version, token) for item in batch], headers)
+
+        def _batch_item(self, item: dict, version: str, token: str) -> dict:
+            relative = urlsplit(str(item.get('relative_url', '')))
+            path = '/' + relative.path.lstrip('/')
+            if version and not path.startswith(f'/{version}/'):
+                path = f'/{version}{path}'
+
+            if str(item.get('method', 'GET')).upper() != 'GET' or not path.endswith('/ads_archive'):
+                return {'code': 404, 'body': json.dumps({'error': {'message': 'Unknown path', 'code': 803}})}
+
+            failure = state.roll_failure()
+            if failure == 429:
+                state.count('throttled')
+                return {'code': 429, 'body': json.dumps({'error': {'message': 'Too many calls', 'code': 17}})}
+            if failure == 500:
+                state.count('server_errors')
+                return {'code': 500, 'body': json.dumps(
+                    {'error': {'message': 'An unexpected error has occurred', 'code': 2}}
+                )}
+
+            query = {k: v[0] for k, v in parse_qs(relative.query).items()}
+            query.pop('access_token', None)
+            state.count('ok')
+            body = archive_page(state, path, query, self._base_url(), token)
+            return {'code': 200, 'body': json.dumps(body)}
+
+        def _respond(self, token, build_body):
+            headers = self._admit(token)
+            if headers is None:
+                return
+
+            failure = state.roll_failure()
+            if failure == 429:
+                state.count('throttled')
+                self._send(429, {'error': {'message': 'Too many calls', 'code': 17}},
+                           {**headers, 'Retry-After': '1'})
+                return
+            if failure == 500:
+                state.count('server_errors')
+                self._send(500, {'error': {'message': 'An unexpected error has occurred', 'code': 2}},
+                           headers)
+                return
+
+            state.count('ok')
+            self._send(200, build_body(), headers)
+
+        def _admit(self, token: str, cost: int = 1):
+            """Quota e autenticação; retorna headers de uso ou None se já respondeu erro"""
+            usage_pct = state.register_call(token, cost)
+            state.sleep_latency()
+            headers = usage_headers(usage_pct)
+
+            if not token or token in state.expired_tokens:
+                state.count('auth_errors')
+                self._send(400, {'error': {
+                    'message': 'Error validating access token: Session has expired',
+                    'type': 'OAuthException',
+                    'code': 190
+                }})
+                return None
+
+            if usage_pct >= 100:
+                state.count('throttled')
+                self._send(400, {'error': {
+                    'message': 'Application request limit reached',
+                    'type': 'OAuthException',
+                    'code': 4
+                }}, headers)
+                return None
+
+            return headers
+
+        def _base_url(self) -> str:
+            host, port = self.server.server_address[:2]
+            return f'http://{host}:{port}'
+
+        def _send(self, status: int, body, headers: dict = None):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+class MockAdLibraryServer:
+    """Servidor mock rodando numa thread (para testes e load tests)"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, api_version: str = 'v20.0', **state_kwargs):
+        self.state = MockAdLibraryState(**state_kwargs)
+        self.api_version = api_version
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """URL equivalente a Config.FB_BASE_URL"""
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/{self.api_version}'
+
+    def start(self) -> 'MockAdLibraryServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> dict:
+        with self.state.lock:
+            return dict(self.state.stats)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock local da Meta Ad Library API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ads-per-query', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fração de respostas 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fração de respostas 429')
+    parser.add_argument('--quota', type=int, default=200, help='requests por hora antes de bloquear')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--expired-token', action='append', default=[],
+                        help='token que responde erro 190 (pode repetir)')
+    args = parser.parse_args()
+
+    server = MockAdLibraryServer(
+        host=args.host,
+        port=args.port,
+        ads_per_query=args.ads_per_query,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        quota_per_hour=args.quota,
+        seed=args.seed,
+        expired_tokens=tuple(args.expired_token)
+    )
+
+    print("=" * 60)
+    print("Mock Ad Library API")
+    print("=" * 60)
+    print(f"Base URL: {server.base_url}")
+    print(f"Stats:    http://{args.host}:{server.httpd.server_address[1]}/__stats")
+    print("Ctrl+C para parar")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()